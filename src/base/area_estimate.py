@@ -0,0 +1,112 @@
+"""
+Approximate areas of even and odd levels from vertical lines sampled across the square.
+
+On a vertical line the order of edges is given by sorting their heights, and the length of even levels
+is the sum of every second gap between consecutive heights. The area of even levels is the integral of that
+length over x. It is estimated by stratified sampling: [0, n-1] is divided into equal strata, two random lines
+are drawn in every stratum and the spread of every pair gives the variance of the estimate. The number of strata
+is doubled until the confidence interval is narrower than the requested tolerance. The cost does not depend on
+the number of intersection points, so it suits big graphs where only the split of areas is needed.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+
+from base.slab_utils import get_unique_edges, get_lines_coefs, get_levels_lengths, MAX_CHUNK_ELEMENTS
+
+
+MIN_STRATA = 64  # fewer pairs give too uncertain variance and too narrow intervals
+MAX_SAMPLED_LINES = 2**20
+
+
+
+def get_even_lengths(a:np.ndarray, b:np.ndarray, x:np.ndarray, n:int) -> np.ndarray:
+    '''
+    Calculates the length of even levels on vertical lines with the given x coordinates.
+
+    Returns np.ndarray of shape (len(x),).
+    '''
+
+    even_lengths = np.zeros(len(x))
+    chunk_size = max(1, MAX_CHUNK_ELEMENTS // (len(a) + 2))
+
+    for start in range(0, len(x), chunk_size):
+        stop = start + chunk_size
+        even_lengths[start:stop] = get_levels_lengths(a, b, x[start:stop], n)[:, 0::2].sum(axis=1)
+
+    return even_lengths
+
+
+def iter_parity_estimates(a:np.ndarray, b:np.ndarray, n:int, confidence:float=0.95, seed:int=0):
+    '''
+    Estimates areas of even and odd levels of lines (a, b) with more and more sampled vertical lines
+    (the number of strata is doubled every time, starting from `MIN_STRATA`).
+
+    Yields dicts:
+        "even", "odd" - estimated areas (they always sum up to the area of the square);
+        "half_width" - half-width of the `confidence` interval of both areas (normal approximation);
+        "even_interval", "odd_interval" - the intervals;
+        "lines" - number of vertical lines sampled for the estimate.
+    '''
+
+    if not 0 < confidence < 1:
+        raise Exception(f"`confidence` must be from the interval (0, 1), now it's {confidence}.")
+
+    rng = np.random.default_rng(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    width = n - 1
+    square_area = float(width**2)
+    num_of_strata = MIN_STRATA
+
+    while True:
+        stratum_width = width / num_of_strata
+        starts = np.arange(num_of_strata) * stratum_width
+        x = starts[:, None] + rng.random((num_of_strata, 2)) * stratum_width
+
+        lengths = get_even_lengths(a, b, x.ravel(), n).reshape(num_of_strata, 2)
+        even_area = float(stratum_width * lengths.mean(axis=1).sum())
+        # variance of the mean of two samples in every stratum, estimated from their difference
+        variance = float(stratum_width**2 * ((lengths[:, 0] - lengths[:, 1])**2).sum() / 4)
+        half_width = z * variance**0.5
+
+        yield {
+            "even": even_area,
+            "odd": square_area - even_area,
+            "half_width": half_width,
+            "even_interval": (even_area - half_width, even_area + half_width),
+            "odd_interval": (square_area - even_area - half_width, square_area - even_area + half_width),
+            "lines": 2 * num_of_strata,
+        }
+
+        num_of_strata *= 2
+
+
+def estimate_parity_areas(n:int, edges, tolerance:float=0.001, confidence:float=0.95,
+                          max_lines:int=MAX_SAMPLED_LINES, seed:int=0, check=None) -> dict:
+    '''
+    Estimates areas of even and odd levels of the graph with given edges, without creating the Graph,
+    refining the estimate until the half-width of its confidence interval is at most `tolerance`
+    times the area of the square (or `max_lines` vertical lines would be exceeded).
+
+    Takes `n`:int, `edges` (list of tuples or np.ndarray of shape (E, 2)), `tolerance`:float, `confidence`:float,
+    `max_lines`:int, `seed`:int and optionally `check` - function called with every estimate
+    (i.e. to stop long computations).
+
+    Returns dict from `iter_parity_estimates` with "confidence" and "tolerance_met":bool.
+    '''
+
+    if not tolerance > 0:
+        raise Exception(f"`tolerance` must be greater than 0, now it's {tolerance}.")
+
+    a, b = get_lines_coefs(n, get_unique_edges(n, edges))
+    square_area = (n-1)**2
+
+    for estimate in iter_parity_estimates(a, b, n, confidence, seed):
+        if check is not None:
+            check(estimate)
+        # the next estimate samples twice as many lines
+        if estimate["half_width"] <= tolerance * square_area or 2 * estimate["lines"] > max_lines:
+            break
+
+    return {**estimate, "confidence": confidence, "tolerance_met": estimate["half_width"] <= tolerance * square_area}
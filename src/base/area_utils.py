@@ -0,0 +1,162 @@
+from typing import Tuple
+
+import numpy as np
+
+from base.base_graph_classes.polygon import Poly
+
+
+
+def polys_to_arrays(polys:list) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Concatenates vertices of all polygons into one array.
+
+    Takes list of Poly objects.
+
+    Returns (coords, offsets): coords - np.ndarray of shape (number of all vertices, 2),
+    offsets - np.ndarray of shape (number of polygons + 1,), vertices of the i-th polygon
+    are coords[offsets[i]:offsets[i+1]].
+    '''
+
+    if not all([isinstance(poly, Poly) for poly in polys]):
+        raise Exception(f"All elements of `polys` must be of type Poly.")
+
+    sizes = [len(poly.verts) for poly in polys]
+    offsets = np.zeros(len(polys) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    coords = np.array([point.coords for poly in polys for point in poly.verts], dtype=float).reshape(-1, 2)
+
+    return coords, offsets
+
+
+def get_signed_areas(coords:np.ndarray, offsets:np.ndarray) -> np.ndarray:
+    '''
+    Calculates signed areas of all polygons at once, using shoelace formula:
+    https://en.wikipedia.org/wiki/Shoelace_formula
+
+    Takes `coords` and `offsets` (see `polys_to_arrays`).
+
+    Returns np.ndarray of shape (number of polygons,) - positive for counterclockwise polygons.
+    '''
+
+    num_of_polys = len(offsets) - 1
+    if len(coords) == 0:
+        return np.zeros(num_of_polys)
+
+    sizes = np.diff(offsets)
+    polys_ids = np.repeat(np.arange(num_of_polys), sizes)
+
+    # index of the next vertex - the first vertex of the polygon follows the last one
+    next_indexes = np.arange(1, len(coords) + 1)
+    non_empty = sizes > 0
+    next_indexes[offsets[1:][non_empty] - 1] = offsets[:-1][non_empty]
+
+    x, y = coords[:, 0], coords[:, 1]
+    cross_products = x * y[next_indexes] - x[next_indexes] * y
+
+    return np.bincount(polys_ids, weights=cross_products, minlength=num_of_polys) / 2
+
+
+def get_areas(coords:np.ndarray, offsets:np.ndarray) -> np.ndarray:
+    '''
+    Returns (unsigned) areas of all polygons as np.ndarray of shape (number of polygons,).
+    '''
+
+    return np.abs(get_signed_areas(coords, offsets))
+
+
+def levels_to_faces_arrays(graph_levels) -> dict:
+    '''
+    Changes levels of the graph (list or generator of graph level dicts, see `Graph.get_polygons`)
+    into arrays of all polygons (see `Graph.get_faces_arrays`).
+
+    Returns dict with "coords", "offsets", "levels" and "areas".
+    '''
+
+    polys = []
+    levels = []
+    for level in graph_levels:
+        polys.extend(level.get("polygons"))
+        levels.extend([level.get("level")] * len(level.get("polygons")))
+
+    coords, offsets = polys_to_arrays(polys)
+
+    return {
+        "coords": coords,
+        "offsets": offsets,
+        "levels": np.array(levels, dtype=np.int64),
+        "areas": get_areas(coords, offsets),
+    }
+
+
+def sum_by_group(values:np.ndarray, groups:np.ndarray, num_of_groups:int=None) -> np.ndarray:
+    '''
+    Sums `values` with the same group number (i.e. level or parity of the level).
+
+    Returns np.ndarray of shape (number of groups,).
+    '''
+
+    if num_of_groups is None:
+        num_of_groups = int(groups.max()) + 1 if len(groups) != 0 else 0
+
+    return np.bincount(groups, weights=values, minlength=num_of_groups)
+
+
+LEVELS_SUMMARY_DTYPE = np.dtype([
+    ("level", np.int64),
+    ("faces", np.int64),
+    ("area", float),
+    ("verts", np.int64),
+    ("min_x", float),
+    ("min_y", float),
+    ("max_x", float),
+    ("max_y", float),
+])
+
+
+def get_levels_summary(coords:np.ndarray, offsets:np.ndarray, levels:np.ndarray, num_of_levels:int=None) -> np.ndarray:
+    '''
+    Summarizes polygons level by level: number of faces, total area, number of vertices
+    and bounding box (nan for levels without polygons).
+
+    Takes `coords`, `offsets` (see `polys_to_arrays`), `levels` - level of every polygon
+    and optionally `num_of_levels`:int.
+
+    Returns np.ndarray of dtype LEVELS_SUMMARY_DTYPE, the i-th row describes the i-th level.
+    '''
+
+    levels = np.asarray(levels, dtype=np.int64)
+    if num_of_levels is None:
+        num_of_levels = int(levels.max()) + 1 if len(levels) != 0 else 0
+
+    sizes = np.diff(offsets)
+    verts_levels = np.repeat(levels, sizes)
+
+    summary = np.zeros(num_of_levels, dtype=LEVELS_SUMMARY_DTYPE)
+    summary["level"] = np.arange(num_of_levels)
+    summary["faces"] = np.bincount(levels, minlength=num_of_levels)
+    summary["area"] = sum_by_group(get_areas(coords, offsets), levels, num_of_levels)
+    summary["verts"] = np.bincount(levels, weights=sizes, minlength=num_of_levels)
+
+    for i, field in enumerate(["x", "y"]):
+        lower = np.full(num_of_levels, np.inf)
+        upper = np.full(num_of_levels, -np.inf)
+        np.minimum.at(lower, verts_levels, coords[:, i])
+        np.maximum.at(upper, verts_levels, coords[:, i])
+
+        is_empty = summary["verts"] == 0
+        summary["min_" + field] = np.where(is_empty, np.nan, lower)
+        summary["max_" + field] = np.where(is_empty, np.nan, upper)
+
+    return summary
+
+
+def summary_to_dict(summary:np.ndarray) -> dict:
+    '''
+    Changes structured array (i.e. levels summary) to dict: field name -> np.ndarray,
+    which can be passed straight to `pandas.DataFrame`.
+
+    Returns dict.
+    '''
+
+    return {name: summary[name].copy() for name in summary.dtype.names}
@@ -18,8 +18,6 @@ class Edge():
     '''
 
     TYPE = EdgeType.UNDEFINED
-    line_coefs = None
-    intersection_points = []
 
 
     def __init__(self, x:Point, y:Point):
@@ -28,6 +26,8 @@ class Edge():
             raise Exception(f"`x` and `y` must be Points, now type of x is {type(x)} and type of y is {type(y)}")
         
         self.end_points = [x, y]
+        self.line_coefs = None
+        self.intersection_points = []
 
 
     def __repr__(self) -> str:
@@ -16,7 +16,6 @@ class Point():
     '''
 
     TYPE = PointType.UNDEFINED
-    branches_points =[]
 
     def __init__(self, x:float, y:float):
 
@@ -28,6 +27,9 @@ class Point():
         self.x = x
         self.y = y
         self.coords = (x, y)
+        self.branches_points = []
+        # next_points[k] - the next point of a polygon coming to the point from branches_points[k]
+        self.next_points = []
 
 
     def __repr__(self) -> str:  
@@ -0,0 +1,172 @@
+"""
+Batch computation of areas of many graphs with checkpoints.
+
+Results are written in order to a JSON lines file. Every `checkpoint_every` graphs the output file is
+flushed to disk and the checkpoint (number of finished graphs, size of the output file and partial
+statistics) is atomically replaced. After a crash the run is started again with the same arguments:
+the output file is truncated to the size from the checkpoint and graphs finished before are skipped,
+so the output is the same as of a run without interruption.
+"""
+
+import json
+import os
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+from base.the_graph import Graph
+from base.monte_carlo import StreamingStats
+
+
+CHECKPOINT_VERSION = 1
+
+
+
+def run_item(args:tuple) -> dict:
+    '''
+    Builds the graph with `n` vertices on one side and given edges and calculates its areas.
+
+    Returns dict - result line of the batch (areas of even and odd levels or the error).
+    '''
+
+    n, edges = args
+
+    try:
+        graph = Graph(n, [tuple(edge) for edge in edges], keep_levels=False)
+        even_area, odd_area = graph.get_area_of_polys()
+    except Exception as exception:
+        return {"error": repr(exception)}
+
+    return {"even": even_area, "odd": odd_area}
+
+
+def load_checkpoint(checkpoint_path:str, n:int) -> dict:
+    '''
+    Reads the checkpoint of the batch with `n` vertices on one side.
+
+    Returns dict or None if there is no checkpoint.
+    '''
+
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return None
+
+    with open(checkpoint_path) as file:
+        checkpoint = json.load(file)
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("n") != n:
+        raise Exception(f"Checkpoint {checkpoint_path} does not belong to the batch with n = {n}.")
+
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path:str, checkpoint:dict) -> None:
+    '''
+    Writes the checkpoint atomically - to the temporary file replacing the old checkpoint,
+    so a crash never leaves half-written checkpoint.
+
+    Returns None.
+    '''
+
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, checkpoint_path)
+
+
+def run_batch(n:int, edges_sets, output_path:str, checkpoint_path:str=None, checkpoint_every:int=1000,
+              processes:int=1, bins:int=1000) -> dict:
+    '''
+    Calculates areas of even and odd levels of graphs with `n` vertices on one side and edges from `edges_sets`.
+
+    Takes `n`:int, `edges_sets` (iterable of lists of edges, the same on every run), `output_path`:str
+    (JSON lines file, i-th line is the result of the i-th graph), `checkpoint_path`:str (None - no checkpoints),
+    `checkpoint_every`:int (number of graphs between checkpoints), `processes`:int (number of worker processes)
+    and `bins`:int (bins of the histogram of the even area ratio).
+
+    Returns dict with:
+        "count" - number of finished graphs, "resumed_from" - number of graphs finished before the run,
+        "stats" - StreamingStats of the even area ratio (area of even levels / area of the square),
+        "errors" - number of graphs which could not be built,
+        "checkpoints", "checkpoint_seconds", "seconds" - number of checkpoints and time spent on them and on the run.
+    '''
+
+    if not isinstance(checkpoint_every, int) or checkpoint_every < 1:
+        raise Exception(f"`checkpoint_every` must be int greater than 0, now it is {checkpoint_every}.")
+
+    start_time = time.perf_counter()
+    checkpoint = load_checkpoint(checkpoint_path, n)
+
+    if checkpoint is not None:
+        # results written after the checkpoint are computed again
+        os.truncate(output_path, checkpoint["output_size"])
+        output = open(output_path, "ab")
+        offset = checkpoint["offset"]
+        errors = checkpoint["errors"]
+        stats = StreamingStats.from_state(checkpoint["stats"])
+    else:
+        output = open(output_path, "wb")
+        offset = 0
+        errors = 0
+        stats = StreamingStats(bins=bins)
+
+    square_area = (n-1)**2
+    count = offset
+    num_of_checkpoints = 0
+    checkpoint_seconds = 0.0
+
+    def make_checkpoint() -> None:
+        nonlocal num_of_checkpoints, checkpoint_seconds
+        checkpoint_start = time.perf_counter()
+
+        output.flush()
+        os.fsync(output.fileno())
+        save_checkpoint(checkpoint_path, {
+            "version": CHECKPOINT_VERSION,
+            "n": n,
+            "offset": count,
+            "output_size": output.tell(),
+            "errors": errors,
+            "stats": stats.get_state(),
+        })
+
+        num_of_checkpoints += 1
+        checkpoint_seconds += time.perf_counter() - checkpoint_start
+
+    items = ((n, edges) for edges in islice(edges_sets, offset, None))
+    pool = Pool(processes) if processes > 1 else None
+
+    try:
+        results = pool.imap(run_item, items, chunksize=16) if pool is not None else map(run_item, items)
+
+        for result in results:
+            result = {"index": count, **result}
+            output.write((json.dumps(result) + "\n").encode())
+
+            if "error" in result:
+                errors += 1
+            else:
+                stats.add(result["even"] / square_area)
+            count += 1
+
+            if checkpoint_path is not None and (count - offset) % checkpoint_every == 0:
+                make_checkpoint()
+
+        if checkpoint_path is not None:
+            make_checkpoint()
+    finally:
+        output.close()
+        if pool is not None:
+            pool.terminate()
+
+    return {
+        "count": count,
+        "resumed_from": offset,
+        "stats": stats,
+        "errors": errors,
+        "checkpoints": num_of_checkpoints,
+        "checkpoint_seconds": checkpoint_seconds,
+        "seconds": time.perf_counter() - start_time,
+    }
@@ -0,0 +1,87 @@
+"""
+Time and work budgets of graph computations.
+
+Long loops (intersections of edges, walking around faces, searching levels) call `Budget.check`
+cooperatively. When the deadline passes, the number of steps is exceeded or the budget is cancelled
+(i.e. from another thread), `GraphTimeoutError` carrying the progress of the computation is raised.
+"""
+
+import threading
+import time
+
+
+
+class GraphTimeoutError(Exception):
+    '''
+    Raised when the budget of the computation is used up or cancelled.
+
+    `progress` - dict with the progress of the computation when it was stopped:
+        "phase" - "intersections", "branches", "polygons" or "sampling" (approximate areas);
+        "steps" - number of steps done;
+        "estimate" - the last estimate of areas (in the "sampling" phase, see base/area_estimate.py);
+        "levels_completed" - number of found levels;
+        "levels_areas" - areas of found levels, "even_area", "odd_area" - their sums by parity.
+    '''
+
+    def __init__(self, message:str, progress:dict):
+        super().__init__(message)
+        self.progress = progress
+
+
+
+class Budget():
+    '''
+    Limits computations by time (`seconds` counted from creating the budget) and/or
+    by work (`max_steps` - number of cooperative checks, i.e. edges or polygon vertices).
+    The budget can be cancelled from another thread by `cancel`.
+    '''
+
+    def __init__(self, seconds:float=None, max_steps:int=None):
+
+        if seconds is not None and not (isinstance(seconds, (int, float)) and seconds >= 0):
+            raise Exception(f"`seconds` must be non-negative number or None, now it is {seconds}.")
+        if max_steps is not None and not (isinstance(max_steps, int) and max_steps >= 0):
+            raise Exception(f"`max_steps` must be non-negative int or None, now it is {max_steps}.")
+
+        self.seconds = seconds
+        self.max_steps = max_steps
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.steps = 0
+        self.progress = {}
+        self.cancelled = threading.Event()
+
+
+    def __repr__(self) -> str:
+        return f"Budget(seconds={self.seconds}, max_steps={self.max_steps}, steps={self.steps})"
+
+
+    def cancel(self) -> None:
+        '''
+        Stops the computation using the budget at its next check. Can be called from any thread.
+
+        Returns None.
+        '''
+
+        self.cancelled.set()
+
+
+    def check(self, steps:int=1) -> None:
+        '''
+        Counts `steps` and raises GraphTimeoutError if the budget is used up or cancelled.
+
+        Returns None.
+        '''
+
+        self.steps += steps
+
+        if self.cancelled.is_set():
+            reason = "the computation has been cancelled"
+        elif self.max_steps is not None and self.steps > self.max_steps:
+            reason = f"the work budget of {self.max_steps} steps has been exceeded"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            reason = f"the time budget of {self.seconds}s has been exceeded"
+        else:
+            return
+
+        progress = {key: list(value) if isinstance(value, list) else value for key, value in self.progress.items()}
+        raise GraphTimeoutError(f"Graph computation stopped: {reason}.", {**progress, "steps": self.steps})
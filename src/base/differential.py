@@ -0,0 +1,429 @@
+"""
+Differential testing of graph engines against the reference Graph.
+
+The reference is the Graph built with the python kernels. Engines are other ways of computing
+the same results (numba kernels, the Graph without kept levels, arrays of `slab_utils`).
+Cases are seeded random edge sets and adversarial ones (many lines through one point, near-parallel
+edges, full bipartite graphs, edges at the corners). For every case intersection points, levels
+and areas of both paths are compared within tolerance, failing cases are shrunk to minimal
+reproducers and the speed ratio of the engine to the reference is reported.
+"""
+
+import random
+import time
+
+import numpy as np
+
+from base import kernels
+from base.the_graph import Graph
+from base.slab_utils import get_unique_edges, get_lines_coefs, get_slabs, get_levels_areas_on_slabs, EPS
+
+
+ADVERSARIAL_KINDS = ["concurrent", "near_parallel", "full", "corners", "many_levels", "rounding_ties"]
+MANY_LEVELS_N = 256  # "many_levels" cases have more than 200 edges and levels
+ROUNDING_TIES_SIZES = [24, 36, 44]  # such points exist from n = 23, points of three lines from n = 40
+POINTS_TOLERANCE = 10**(-3)  # intersection points of the Graph are rounded to 4 decimals
+
+ENGINES = {}
+
+
+
+def engine(func):
+    ENGINES[func.__name__] = func
+    return func
+
+
+def get_graph_result(graph:Graph) -> dict:
+    '''
+    Collects results of the built graph compared by the harness:
+        "intersections" - np.ndarray of shape (number of intersection points, 2);
+        "levels_areas", "levels_faces" - area and number of faces of every level (None if not known);
+        "faces" - number of faces, "areas" - (even_area_val, odd_area_val).
+
+    Returns dict.
+    '''
+
+    summary = graph.get_levels_summary()
+
+    return {
+        "intersections": np.array([point.coords for point in graph.intersection_points], dtype=float).reshape(-1, 2),
+        "levels_areas": summary["area"],
+        "levels_faces": summary["faces"],
+        "faces": int(summary["faces"].sum()),
+        "areas": graph.get_area_of_polys(),
+    }
+
+
+def get_reference_result(n:int, edges:list) -> dict:
+    '''
+    Computes results (see `get_graph_result`) of the Graph with the python kernels.
+
+    Returns dict.
+    '''
+
+    return get_graph_result(Graph(n, edges, backend=kernels.PYTHON_BACKEND))
+
+
+# engines section
+@engine
+def numba(n:int, edges:list) -> dict:
+    '''
+    The Graph with the numba kernels.
+    '''
+
+    return get_graph_result(Graph(n, edges, backend=kernels.NUMBA_BACKEND))
+
+
+@engine
+def streaming(n:int, edges:list) -> dict:
+    '''
+    The Graph without kept levels (levels are summarized while they are found).
+    '''
+
+    return get_graph_result(Graph(n, edges, keep_levels=False))
+
+
+@engine
+def slab(n:int, edges:list) -> dict:
+    '''
+    Arrays of `slab_utils`: intersection points of all pairs of lines and areas of levels on slabs.
+    Every line adds a face and every line going through an intersection point, apart from the first one,
+    adds another face. Faces of levels are not known.
+    '''
+
+    unique_edges = get_unique_edges(n, edges)
+    a, b = get_lines_coefs(n, unique_edges)
+
+    # coordinates computed from ends of edges like in the Graph (see `kernels.edge_intersections_kernel`)
+    d = (unique_edges[:, 1] - unique_edges[:, 0]).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (n-1) * (b[None, :] - b[:, None]) / (d[:, None] - d[None, :])
+        y = (d[:, None] * b[None, :] - d[None, :] * b[:, None]) / (d[:, None] - d[None, :])
+    is_inside = (x > EPS) & (x < n-1-EPS)
+
+    # intersection points of every line, rounded like in the Graph
+    points = set()
+    faces = 1 + len(a)
+    for i in range(len(a)):
+        line_points = set((round(x_i, 4), round(y_i, 4))
+                          for x_i, y_i in zip(x[i][is_inside[i]].tolist(), y[i][is_inside[i]].tolist()))
+        points.update(line_points)
+        faces += len(line_points)
+    faces -= len(points)
+
+    x_mid, widths = get_slabs(a, b, n)
+    levels_areas = get_levels_areas_on_slabs(a, b, x_mid, widths, n)
+
+    return {
+        "intersections": np.array(sorted(points), dtype=float).reshape(-1, 2),
+        "levels_areas": levels_areas,
+        "levels_faces": None,
+        "faces": faces,
+        "areas": (float(levels_areas[0::2].sum()), float(levels_areas[1::2].sum())),
+    }
+
+
+# cases section
+def get_random_case(n:int, rng:random.Random) -> list:
+    '''
+    Returns list of random edges (from 1 to 2n) of the graph with `n` vertices on one side.
+    '''
+
+    return [(rng.randrange(n), rng.randrange(n)) for i in range(rng.randint(1, 2*n))]
+
+
+def get_rounding_ties_edges(n:int, rng:random.Random, max_points:int=3) -> list:
+    '''
+    Finds intersection points with y exactly halfway between two numbers rounded to 4 decimals
+    (i.e. (22.96875, 17.28125) for n = 36), where y computed from one or the other line (y = a*x + b)
+    is rounded differently. Points with more lines going through them (triple points) are chosen first.
+
+    Returns list of edges going through at most `max_points` such points (empty if there are none).
+    '''
+
+    N = n - 1
+    ends = np.array([(left, right) for left in range(n) for right in range(n)], dtype=np.int64)
+    first, second = np.triu_indices(len(ends), 1)
+    b_0, b_1 = ends[first, 0], ends[second, 0]
+    d_0, d_1 = ends[first, 1] - b_0, ends[second, 1] - b_1
+
+    # the point (X/D, Y/D) of every pair of lines, with D > 0
+    signs = np.sign(d_0 - d_1)
+    D = (d_0 - d_1) * signs
+    X = N * (b_1 - b_0) * signs
+    Y = (d_0 * b_1 - d_1 * b_0) * signs
+    is_inside = (D != 0) & (X > 0) & (X < N * D)
+    D_safe = np.where(D != 0, D, 1)
+
+    def is_tie(numerator:np.ndarray) -> np.ndarray:
+        # numerator / D * 10**4 is an integer and a half
+        halves = 2 * 10**4 * numerator
+        return (halves % D_safe == 0) & ((halves // D_safe) % 2 == 1)
+
+    # y computed from one or the other line (y = a*x + b) is rounded differently
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_0, a_1 = d_0 / N, d_1 / N
+        x = (b_1 - b_0) / (a_0 - a_1)
+        is_fragile = np.round(a_0 * x + b_0, 4) != np.round(a_1 * x + b_1, 4)
+
+    is_chosen = is_inside & is_tie(Y) & is_fragile
+    # points of chosen pairs as reduced (X, Y, D), so every point is found once
+    points = np.stack([X, Y, D], axis=1)[is_chosen]
+    points = np.unique(points // np.gcd.reduce(points, axis=1)[:, None], axis=0).reshape(-1, 3)
+
+    # line (l, r) goes through (X/D, Y/D) if Y*N = l*D*N + (r-l)*X
+    through = points[:, 1, None] * N \
+        == ends[None, :, 0] * points[:, 2, None] * N + (ends[None, :, 1] - ends[None, :, 0]) * points[:, 0, None]
+    counts = through.sum(axis=1)
+
+    order = sorted(range(len(points)), key=lambda i: (-counts[i], rng.random()))[:rng.randint(1, max_points)]
+    return sorted(set(map(tuple, ends[through[order].any(axis=0)].tolist())))
+
+
+def get_adversarial_case(kind:str, n:int, rng:random.Random) -> list:
+    '''
+    Generates edges hard for the computation:
+        "concurrent" - lines going through one point (edges (i, c-i), all crossing in the middle of the square);
+        "near_parallel" - pairs of lines crossing inside the square at small angles: (l, r) and (l+1, r-k) cross
+            at x = (n-1)/(k+1), k = 1 gives the smallest angle, bigger k moves the crossing towards the left side
+            (mirrored pairs - towards the right one), ends of edges are ints, so it is at least 1/2 inside;
+        "full" - all n*n edges;
+        "corners" - edges starting or ending in the corners of the square;
+        "many_levels" - n-2 stacked edges (i, i+d) and the two diagonals, so the graph has about n levels;
+        "rounding_ties" - lines going through points with a coordinate halfway between two numbers rounded
+            to 4 decimals (see `get_rounding_ties_edges`).
+
+    Returns list of edges.
+    '''
+
+    if kind == "concurrent":
+        c = rng.randrange(n-1, n+1) if n > 2 else 1
+        edges = [(i, c-i) for i in range(n) if 0 <= c-i < n]
+        edges += [(rng.randrange(n), rng.randrange(n)) for i in range(rng.randint(0, 2))]
+    elif kind == "near_parallel":
+        edges = []
+        for i in range(rng.randint(1, n)):
+            k = rng.randint(1, n-1)
+            left, right = rng.randrange(n-1), rng.randrange(k, n)
+            pair = [(left, right), (left+1, right-k)]
+            edges += pair if rng.random() < 0.5 else [(right, left) for left, right in pair]
+    elif kind == "full":
+        edges = [(i, j) for i in range(n) for j in range(n)]
+    elif kind == "corners":
+        corner_edges = [(0, j) for j in range(n)] + [(n-1, j) for j in range(n)] \
+            + [(i, 0) for i in range(n)] + [(i, n-1) for i in range(n)]
+        edges = rng.sample(corner_edges, rng.randint(1, len(corner_edges)))
+    elif kind == "many_levels":
+        d = rng.randint(0, 2)
+        edges = [(i, i+d) for i in range(n-d)] + [(0, n-1), (n-1, 0)]
+    elif kind == "rounding_ties":
+        edges = get_rounding_ties_edges(n, rng)
+        edges += [(rng.randrange(n), rng.randrange(n)) for i in range(rng.randint(0, 2))]
+    else:
+        raise Exception(f"`kind` must be one of {ADVERSARIAL_KINDS}, now it's {kind}.")
+
+    return sorted(set(edges))
+
+
+def iter_cases(num_of_random:int=100, max_n:int=8, seed:int=0):
+    '''
+    Yields cases: `num_of_random` random ones and adversarial ones of every kind for n from 2 to `max_n`
+    ("full" only up to n = 6, "many_levels" only for n = `MANY_LEVELS_N`, "rounding_ties" for `ROUNDING_TIES_SIZES`).
+    The same seed gives the same cases.
+
+    Yields dicts {"name", "n", "edges"}.
+    '''
+
+    rng = random.Random(seed)
+
+    for i in range(num_of_random):
+        n = rng.randint(2, max_n)
+        yield {"name": f"random_{i}", "n": n, "edges": get_random_case(n, rng)}
+
+    for kind in ADVERSARIAL_KINDS:
+        if kind == "many_levels":
+            sizes = [MANY_LEVELS_N]
+        elif kind == "rounding_ties":
+            sizes = ROUNDING_TIES_SIZES
+        else:
+            sizes = range(2, (min(max_n, 6) if kind == "full" else max_n) + 1)
+
+        for n in sizes:
+            yield {"name": f"{kind}_{n}", "n": n, "edges": get_adversarial_case(kind, n, rng)}
+
+
+# comparison section
+def compare_points(points_1:np.ndarray, points_2:np.ndarray, tolerance:float) -> bool:
+    '''
+    Checks if every point of one set has a point of the other set closer than `tolerance`.
+
+    Returns bool.
+    '''
+
+    if len(points_1) == 0 or len(points_2) == 0:
+        return len(points_1) == len(points_2)
+
+    distances = np.abs(points_1[:, None, :] - points_2[None, :, :]).max(axis=2)
+
+    return bool(distances.min(axis=1).max() < tolerance and distances.min(axis=0).max() < tolerance)
+
+
+def compare_results(n:int, reference:dict, result:dict, tolerance:float=10**(-4)) -> list:
+    '''
+    Compares results of the engine with the reference ones. Areas are compared with the absolute
+    tolerance `tolerance` * area of the square (coordinates of the Graph are rounded to 4 decimals),
+    levels missing in one of results count as empty.
+
+    Returns list of found differences (str), empty if results agree.
+    '''
+
+    differences = []
+    area_tolerance = tolerance * (n-1)**2
+
+    if len(reference["intersections"]) != len(result["intersections"]):
+        differences.append(f"intersection points: {len(reference['intersections'])} != {len(result['intersections'])}")
+    elif not compare_points(reference["intersections"], result["intersections"], POINTS_TOLERANCE):
+        differences.append("intersection points: coordinates differ")
+
+    num_of_levels = max(len(reference["levels_areas"]), len(result["levels_areas"]))
+    levels_areas_1 = np.pad(np.asarray(reference["levels_areas"], dtype=float), (0, num_of_levels - len(reference["levels_areas"])))
+    levels_areas_2 = np.pad(np.asarray(result["levels_areas"], dtype=float), (0, num_of_levels - len(result["levels_areas"])))
+    different_levels = np.flatnonzero(np.abs(levels_areas_1 - levels_areas_2) > area_tolerance)
+    if len(different_levels) != 0:
+        level = different_levels[0]
+        differences.append(f"levels areas: {len(different_levels)} levels differ, i.e. level {level}: "
+                           f"{levels_areas_1[level]} != {levels_areas_2[level]}")
+
+    if result["levels_faces"] is not None and not np.array_equal(reference["levels_faces"], result["levels_faces"]):
+        differences.append(f"levels faces: {list(reference['levels_faces'])} != {list(result['levels_faces'])}")
+
+    if reference["faces"] != result["faces"]:
+        differences.append(f"faces: {reference['faces']} != {result['faces']}")
+
+    for name, area_1, area_2 in zip(["even", "odd"], reference["areas"], result["areas"]):
+        if abs(area_1 - area_2) > area_tolerance:
+            differences.append(f"{name} area: {area_1} != {area_2}")
+
+    return differences
+
+
+def get_differences_kinds(differences:list) -> set:
+    '''
+    Returns set of kinds of differences (i.e. "faces", "even area", "reference raised").
+    '''
+
+    return set(difference.split(":")[0].split("(")[0] for difference in differences)
+
+
+def run_case(engine_name:str, n:int, edges:list, tolerance:float=10**(-4)) -> dict:
+    '''
+    Runs the reference and the engine on the case. Exceptions raised by any of them are differences too.
+
+    Returns dict with "differences":list and "reference_seconds", "engine_seconds".
+    '''
+
+    run_engine = ENGINES[engine_name]
+    results = []
+    seconds = []
+
+    for func in [get_reference_result, run_engine]:
+        start = time.perf_counter()
+        try:
+            results.append(func(n, edges))
+        except Exception as exception:
+            results.append(exception)
+        seconds.append(time.perf_counter() - start)
+
+    reference, result = results
+    if isinstance(reference, Exception) or isinstance(result, Exception):
+        differences = [f"{name} raised {value!r}" for name, value in zip(["reference", engine_name], results)
+                       if isinstance(value, Exception)]
+        if isinstance(reference, Exception) and isinstance(result, Exception):
+            differences = []  # both reject the case
+    else:
+        differences = compare_results(n, reference, result, tolerance)
+
+    return {"differences": differences, "reference_seconds": seconds[0], "engine_seconds": seconds[1]}
+
+
+def shrink_case(engine_name:str, n:int, edges:list, tolerance:float=10**(-4)) -> list:
+    '''
+    Shrinks failing edges: removes halves, quarters, ... and finally single edges
+    as long as the engine still disagrees with the reference in the same way (with the same kinds of differences).
+
+    Returns minimal list of edges (no single edge can be removed).
+    '''
+
+    kinds = get_differences_kinds(run_case(engine_name, n, edges, tolerance)["differences"])
+
+    def is_failing(edges:list) -> bool:
+        if len(edges) == 0:
+            return False
+        differences = run_case(engine_name, n, edges, tolerance)["differences"]
+        return len(differences) != 0 and get_differences_kinds(differences) & kinds == kinds
+
+    edges = list(edges)
+    chunk_size = max(len(edges) // 2, 1)
+
+    while True:
+        removed = False
+        start = 0
+        while start < len(edges):
+            candidate = edges[:start] + edges[start+chunk_size:]
+            if is_failing(candidate):
+                edges = candidate
+                removed = True
+            else:
+                start += chunk_size
+
+        if chunk_size == 1 and not removed:
+            return edges
+        if not removed:
+            chunk_size = max(chunk_size // 2, 1)
+
+
+def run_harness(engine_name:str="slab", num_of_random:int=100, max_n:int=8, seed:int=0,
+                tolerance:float=10**(-4), shrink:bool=True) -> dict:
+    '''
+    Compares the engine `engine_name` (one of `ENGINES`) with the reference Graph on cases from `iter_cases`.
+
+    Returns dict with:
+        "engine", "cases" - number of cases;
+        "failures" - list of failing cases {"name", "n", "edges", "differences", "minimal_edges"};
+        "reference_seconds", "engine_seconds" - total times, "speed_ratio" - reference time / engine time.
+    '''
+
+    if engine_name not in ENGINES:
+        raise Exception(f"`engine_name` must be one of {list(ENGINES)}, now it's {engine_name}.")
+    if engine_name == "numba" and kernels.NUMBA_BACKEND not in kernels.get_available_backends():
+        raise Exception(f"Engine 'numba' is not available, install numba first (`pip install numba`).")
+
+    failures = []
+    num_of_cases = 0
+    reference_seconds = 0.0
+    engine_seconds = 0.0
+
+    # the first run compiles kernels (if numba is used), so it is not measured
+    run_case(engine_name, 3, [(0, 2), (2, 0)], tolerance)
+
+    for case in iter_cases(num_of_random, max_n, seed):
+        result = run_case(engine_name, case["n"], case["edges"], tolerance)
+        num_of_cases += 1
+        reference_seconds += result["reference_seconds"]
+        engine_seconds += result["engine_seconds"]
+
+        if len(result["differences"]) != 0:
+            failures.append({
+                **case,
+                "differences": result["differences"],
+                "minimal_edges": shrink_case(engine_name, case["n"], case["edges"], tolerance) if shrink else None,
+            })
+
+    return {
+        "engine": engine_name,
+        "cases": num_of_cases,
+        "failures": failures,
+        "reference_seconds": reference_seconds,
+        "engine_seconds": engine_seconds,
+        "speed_ratio": reference_seconds / engine_seconds if engine_seconds > 0 else float("inf"),
+    }
@@ -0,0 +1,406 @@
+"""
+Exhaustive enumeration of all graphs (edge subsets) for small number of vertices.
+
+Subsets are visited in Gray-code order, so two consecutive graphs differ by one edge,
+and areas, intersections and faces are updated incrementally instead of building every Graph.
+With symmetries of the square (see base/symmetry.py) only one graph of every orbit is visited
+and its results are counted for all graphs of the orbit.
+"""
+
+from collections import Counter
+from multiprocessing import Pool
+
+import numpy as np
+
+from base.slab_utils import get_lines_coefs, get_slabs, EPS, DECIMALS
+from base.symmetry import SYMMETRIES, FLIPPING_SYMMETRIES, transform_edges
+
+
+MAX_NUM_OF_VERTICES = 5  # 2^23 subsets for n = 5
+CHUNK_SIZE = 2**16  # Gray-code indexes checked for being orbit representatives at once
+# odd multiplier mixing codes (a bijection modulo 2^bits), so representatives of orbits are spread
+# evenly over Gray-code indexes and shards get similar work
+MIXING_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+
+class EnumerationResult():
+    '''
+    Histograms collected during enumeration. Results of separate shards can be merged.
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.area_histogram = Counter()  # area of even levels -> number of graphs
+        self.faces_histogram = Counter()  # number of faces -> number of graphs
+        self.intersections_histogram = Counter()  # number of intersection points -> number of graphs
+
+
+    def __repr__(self) -> str:
+        return f"EnumerationResult(count={self.count}, areas={len(self.area_histogram)}, faces={len(self.faces_histogram)})"
+
+
+    def add(self, even_area:float, faces:int, intersections:int, decimals:int, count:int=1) -> None:
+        self.count += count
+        self.area_histogram[round(even_area, decimals)] += count
+        self.faces_histogram[faces] += count
+        self.intersections_histogram[intersections] += count
+
+
+    def merge(self, result) -> None:
+        '''
+        Adds histograms of another EnumerationResult to self.
+
+        Returns None.
+        '''
+
+        self.count += result.count
+        self.area_histogram.update(result.area_histogram)
+        self.faces_histogram.update(result.faces_histogram)
+        self.intersections_histogram.update(result.intersections_histogram)
+
+
+
+class GrayCodeEnumerator():
+    '''
+    Walks through all subsets of possible edges of the graph with `n` vertices on one side.
+
+    The i-th visited subset is the Gray code i ^ (i >> 1): its k-th bit says whether
+    the k-th of `candidate_edges` is in the graph. (0, 0) and (n-1, n-1) edges are ignored by the Graph,
+    so they are not candidates.
+    '''
+
+    def __init__(self, n:int):
+
+        if not isinstance(n, int):
+            raise Exception(f"`n` must be of type int, now it is {type(n)}.")
+        if n < 2 or n > MAX_NUM_OF_VERTICES:
+            raise Exception(f"`n` must be from 2 to {MAX_NUM_OF_VERTICES}, now it is {n}.")
+
+        self.n = n
+        self.candidate_edges = [(i, j) for i in range(n) for j in range(n) if (i, j) != (0, 0) and (i, j) != (n-1, n-1)]
+        self.num_of_subsets = 2**len(self.candidate_edges)
+
+        self.prepare_slabs()
+        self.prepare_intersection_points()
+        self.prepare_symmetries()
+        self.reset()
+
+
+    def prepare_slabs(self) -> None:
+        '''
+        Slabs of the arrangement of all candidate edges are finer than slabs of any subset,
+        so the order of edges in every slab is computed once.
+
+        Returns None.
+        '''
+
+        a, b = get_lines_coefs(self.n, np.array(self.candidate_edges))
+        self.a, self.b = a, b
+        x_mid, self.widths = get_slabs(a, b, self.n)
+
+        self.heights = a[None, :] * x_mid[:, None] + b[None, :]  # (slabs, lines)
+        self.order = np.argsort(self.heights, axis=1)
+        self.sorted_heights = np.take_along_axis(self.heights, self.order, axis=1)
+        self.positions = np.argsort(self.order, axis=1)  # position of every line in the slab order
+        self.ranks = np.arange(len(self.candidate_edges))[None, :]
+
+
+    def prepare_intersection_points(self) -> None:
+        '''
+        Gives every intersection point of candidate edges an id, so points where more
+        than two edges meet are counted once.
+
+        Returns None.
+        '''
+
+        num_of_lines = len(self.candidate_edges)
+        a, b = self.a, self.b
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = (b[None, :] - b[:, None]) / (a[:, None] - a[None, :])
+            y = a[:, None] * x + b[:, None]
+
+        is_inside = (x > EPS) & (x < self.n-1-EPS)
+
+        coords = np.round(np.stack([x[is_inside], y[is_inside]], axis=1), DECIMALS)
+        unique_coords, ids = np.unique(coords, axis=0, return_inverse=True)
+
+        self.point_ids = np.full((num_of_lines, num_of_lines), -1, dtype=np.int64)
+        self.point_ids[is_inside] = ids.ravel()
+        self.num_of_all_points = len(unique_coords)
+
+
+    def prepare_symmetries(self) -> None:
+        '''
+        Changes symmetries of the square into permutations of bits of codes. A code is mapped byte by byte:
+        `symmetry_tables[s][b][v]` is the image of the b-th byte equal to v under the s-th symmetry.
+
+        Returns None.
+        '''
+
+        indexes = {edge: k for k, edge in enumerate(self.candidate_edges)}
+        num_of_bytes = -(-len(self.candidate_edges) // 8)
+        values = np.arange(256)
+
+        self.symmetry_tables = np.zeros((len(SYMMETRIES) - 1, num_of_bytes, 256), dtype=np.int64)
+        for s, symmetry in enumerate(SYMMETRIES[1:]):
+            images = transform_edges(self.n, self.candidate_edges, symmetry)
+            permutation = [indexes[tuple(edge)] for edge in images.tolist()]
+
+            for k, image_k in enumerate(permutation):
+                self.symmetry_tables[s, k // 8] |= ((values >> (k % 8)) & 1) << image_k
+
+
+    def get_codes_images(self, codes:np.ndarray) -> np.ndarray:
+        '''
+        Maps codes by the symmetries other than identity.
+
+        Returns np.ndarray of shape (3, len(codes)).
+        '''
+
+        images = np.zeros((len(self.symmetry_tables), len(codes)), dtype=np.int64)
+        for b in range(self.symmetry_tables.shape[1]):
+            images |= self.symmetry_tables[:, b, (codes >> (8*b)) & 255]
+
+        return images
+
+
+    def get_mixed_codes(self, codes:np.ndarray) -> np.ndarray:
+        '''
+        Returns np.ndarray - codes multiplied by `MIXING_MULTIPLIER` modulo 2^(number of candidate edges).
+        '''
+
+        mask = np.uint64(2**len(self.candidate_edges) - 1)
+        return (codes.astype(np.uint64) * np.uint64(MIXING_MULTIPLIER)) & mask
+
+
+    def reset(self) -> None:
+        '''
+        Sets the state to the graph without edges.
+
+        Returns None.
+        '''
+
+        self.code = 0
+        self.active = np.zeros(len(self.candidate_edges), dtype=bool)
+        # even minus odd length of levels in the middle of every slab
+        self.signed_lengths = np.full(len(self.widths), self.n-1.0)
+        self.point_counts = np.zeros(self.num_of_all_points, dtype=np.int64)
+        self.num_of_points = 0
+        self.num_of_faces = 1
+
+
+    def toggle(self, k:int) -> None:
+        '''
+        Adds the k-th candidate edge to the graph or deletes it.
+
+        If the edge lies at height h, parity of every level above h changes, so the new signed length is
+        2 * G(h) - F, where F is the old signed length and G(h) the signed length of levels below h.
+
+        Returns None.
+        '''
+
+        is_added = not self.active[k]
+        self.active[k] = False
+
+        # signed length below the edge - over active edges lying below it, in order
+        positions = self.positions[:, k]
+        below = self.active[self.order] & (self.ranks < positions[:, None])
+        indexes = np.cumsum(below, axis=1)
+        signs = np.where(indexes % 2 == 1, 2.0, -2.0)
+        signed_below = (below * signs * self.sorted_heights).sum(axis=1)
+        num_below = indexes[:, -1]
+        signed_below += np.where(num_below % 2 == 0, 1.0, -1.0) * self.heights[:, k]
+
+        self.signed_lengths = 2 * signed_below - self.signed_lengths
+
+        # intersection points on the edge; an edge split by m points splits m+1 faces
+        ids = self.point_ids[k, self.active]
+        ids = ids[ids >= 0]
+        unique_ids = np.unique(ids)
+
+        if is_added:
+            self.num_of_points += int((self.point_counts[unique_ids] == 0).sum())
+            np.add.at(self.point_counts, ids, 1)
+            self.num_of_faces += 1 + len(unique_ids)
+        else:
+            np.add.at(self.point_counts, ids, -1)
+            self.num_of_points -= int((self.point_counts[unique_ids] == 0).sum())
+            self.num_of_faces -= 1 + len(unique_ids)
+
+        self.active[k] = is_added
+        self.code ^= 1 << k
+
+
+    def set_code(self, code:int) -> None:
+        '''
+        Sets the state to the subset given by bits of `code`.
+
+        Returns None.
+        '''
+
+        self.reset()
+        for k in range(len(self.candidate_edges)):
+            if code >> k & 1:
+                self.toggle(k)
+
+
+    def get_edges(self, code:int=None) -> list:
+        '''
+        Returns list of edges (tuples) of the subset `code` (the current one by default).
+        '''
+
+        if code is None:
+            code = self.code
+        return [edge for k, edge in enumerate(self.candidate_edges) if code >> k & 1]
+
+
+    def get_area_of_polys(self) -> tuple:
+        '''
+        Returns (even_area_val, odd_area_val) of the current graph.
+        '''
+
+        square_area = (self.n-1)**2
+        even_area = float(self.widths @ (self.n-1 + self.signed_lengths) / 2)
+
+        return (even_area, square_area - even_area)
+
+
+    def iter_graphs(self, start:int=0, stop:int=None):
+        '''
+        Walks through subsets with Gray-code indexes from `start` to `stop` (excluding).
+
+        Yields (code, even_area, odd_area, number_of_faces, number_of_intersection_points).
+        '''
+
+        if stop is None:
+            stop = self.num_of_subsets
+        if start < 0 or stop > self.num_of_subsets or start > stop:
+            raise Exception(f"`start` and `stop` must satisfy 0 <= start <= stop <= {self.num_of_subsets}.")
+        if start == stop:
+            return
+
+        self.set_code(start ^ (start >> 1))
+
+        for i in range(start, stop):
+            even_area, odd_area = self.get_area_of_polys()
+            yield (self.code, even_area, odd_area, self.num_of_faces, self.num_of_points)
+
+            if i + 1 < stop:
+                # the bit changing between Gray codes of i and i+1 is the lowest set bit of i+1
+                self.toggle(((i+1) & -(i+1)).bit_length() - 1)
+
+
+    def iter_orbits(self, start:int=0, stop:int=None):
+        '''
+        Walks through subsets with Gray-code indexes from `start` to `stop` (excluding) being representatives
+        of their orbits - codes with the smallest mixed code (see `get_mixed_codes`) among their images.
+        Every orbit has exactly one representative,
+        so shards of Gray-code indexes visit every orbit once. Subsets are updated by toggling edges
+        differing between consecutive representatives.
+
+        Yields (code, even_area, odd_area, number_of_faces, number_of_intersection_points,
+        orbit size, number of graphs of the orbit with swapped areas of even and odd levels).
+        '''
+
+        if stop is None:
+            stop = self.num_of_subsets
+        if start < 0 or stop > self.num_of_subsets or start > stop:
+            raise Exception(f"`start` and `stop` must satisfy 0 <= start <= stop <= {self.num_of_subsets}.")
+
+        self.reset()
+        is_flipping = np.array([symmetry in FLIPPING_SYMMETRIES for symmetry in SYMMETRIES[1:]])
+
+        for chunk_start in range(start, stop, CHUNK_SIZE):
+            indexes = np.arange(chunk_start, min(chunk_start + CHUNK_SIZE, stop), dtype=np.int64)
+            codes = indexes ^ (indexes >> 1)
+            images = self.get_codes_images(codes)
+            mixed_images = np.stack([self.get_mixed_codes(codes_images) for codes_images in images])
+            is_representative = self.get_mixed_codes(codes) <= mixed_images.min(axis=0)
+
+            for code, code_images in zip(codes[is_representative].tolist(), images[:, is_representative].T.tolist()):
+                difference = self.code ^ code
+                while difference:
+                    k = (difference & -difference).bit_length() - 1
+                    self.toggle(k)
+                    difference &= difference - 1
+
+                # the first symmetry giving every different graph of the orbit decides if its parity is swapped
+                orbit = {code: False}
+                is_odd = bin(code).count("1") % 2 == 1
+                for image, flipping in zip(code_images, is_flipping):
+                    orbit.setdefault(image, bool(flipping) and is_odd)
+
+                even_area, odd_area = self.get_area_of_polys()
+                yield (code, even_area, odd_area, self.num_of_faces, self.num_of_points, len(orbit), sum(orbit.values()))
+
+
+    def run(self, start:int=0, stop:int=None, decimals:int=6, use_symmetry:bool=False) -> EnumerationResult:
+        '''
+        Collects histograms of subsets from `start` to `stop`. If `use_symmetry` is True, only representatives
+        of orbits are computed (see `iter_orbits`) and counted for every graph of the orbit.
+
+        Returns EnumerationResult.
+        '''
+
+        result = EnumerationResult()
+
+        if not use_symmetry:
+            for code, even_area, odd_area, faces, points in self.iter_graphs(start, stop):
+                result.add(even_area, faces, points, decimals)
+            return result
+
+        for code, even_area, odd_area, faces, points, orbit_size, num_of_swapped in self.iter_orbits(start, stop):
+            if orbit_size > num_of_swapped:
+                result.add(even_area, faces, points, decimals, orbit_size - num_of_swapped)
+            if num_of_swapped > 0:
+                result.add(odd_area, faces, points, decimals, num_of_swapped)
+
+        return result
+
+
+
+def run_shard(args:tuple) -> EnumerationResult:
+    n, start, stop, decimals, use_symmetry = args
+    return GrayCodeEnumerator(n).run(start, stop, decimals, use_symmetry)
+
+
+def enumerate_graphs(n:int, processes:int=None, num_of_shards:int=None, decimals:int=6,
+                     use_symmetry:bool=False) -> EnumerationResult:
+    '''
+    Enumerates all graphs with `n` vertices on one side, sharding the Gray-code sequence
+    into continuous ranges computed by separate processes.
+
+    Takes `n`:int, `processes`:int (number of worker processes, 1 - no subprocesses),
+    `num_of_shards`:int (by default 4 shards for every process) and
+    `decimals`:int (areas are rounded to that many decimals in the histogram) and
+    `use_symmetry`:bool (if True, one graph of every orbit of symmetries of the square is computed).
+
+    Returns merged EnumerationResult.
+    '''
+
+    num_of_subsets = GrayCodeEnumerator(n).num_of_subsets
+
+    if processes is None:
+        from os import cpu_count
+        processes = cpu_count() or 1
+    if num_of_shards is None:
+        num_of_shards = 4 * processes
+    num_of_shards = max(1, min(num_of_shards, num_of_subsets))
+
+    bounds = [num_of_subsets * i // num_of_shards for i in range(num_of_shards + 1)]
+    shards = [(n, bounds[i], bounds[i+1], decimals, use_symmetry) for i in range(num_of_shards)]
+
+    result = EnumerationResult()
+
+    if processes == 1:
+        for shard in shards:
+            result.merge(run_shard(shard))
+        return result
+
+    with Pool(processes) as pool:
+        for shard_result in pool.imap_unordered(run_shard, shards):
+            result.merge(shard_result)
+
+    return result
@@ -0,0 +1,270 @@
+"""
+Faces changed by removing and adding edges of the graph, found without building the changed graph.
+
+Every face of the graph is a convex polygon. Removing edges merges faces lying on both sides of their segments:
+faces joined across removed segments form one face of the graph without these edges (their convex hull).
+Adding edges splits the faces they cross. Other faces keep their shape and their level changes only
+by the number of added minus removed edges lying below them.
+"""
+
+import numpy as np
+
+from base.area_utils import get_areas
+
+
+ON_LINE_TOLERANCE = 10**(-3)  # points of the graph are rounded to 4 decimals, points closer to a line lie on it
+COORDS_DECIMALS = 4  # the same as for intersection points of the Graph
+
+
+
+def get_faces_sides_of_line(coords:np.ndarray, offsets:np.ndarray, a:float, b:float) -> tuple:
+    '''
+    Checks, for every face, if it has vertices above and below the line y = a*x + b.
+
+    Returns (is_above, is_below) - np.ndarrays of bools, one element for every face.
+    '''
+
+    if len(offsets) < 2:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+
+    heights = coords[:, 1] - (a * coords[:, 0] + b)
+    is_above = np.maximum.reduceat(heights, offsets[:-1]) > ON_LINE_TOLERANCE
+    is_below = np.minimum.reduceat(heights, offsets[:-1]) < -ON_LINE_TOLERANCE
+
+    return is_above, is_below
+
+
+def get_centroids(coords:np.ndarray, offsets:np.ndarray) -> np.ndarray:
+    '''
+    Returns means of vertices of faces (points inside the convex faces), np.ndarray of shape (number of faces, 2).
+    '''
+
+    if len(offsets) < 2:
+        return np.zeros((0, 2))
+
+    return np.add.reduceat(coords, offsets[:-1], axis=0) / np.diff(offsets)[:, None]
+
+
+def count_lines_below(points:np.ndarray, a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    '''
+    Returns the number of lines (a, b) lying below every point, np.ndarray of ints.
+    '''
+
+    return (a[None, :] * points[:, 0, None] + b[None, :] < points[:, 1, None]).sum(axis=1)
+
+
+def get_convex_hull(points:np.ndarray) -> np.ndarray:
+    '''
+    Calculates the convex hull of points (monotone chain), without collinear points.
+
+    Returns np.ndarray of shape (number of hull vertices, 2), vertices in counterclockwise order.
+    '''
+
+    points = sorted(set(map(tuple, points.tolist())))
+    if len(points) < 3:
+        return np.array(points, dtype=float).reshape(-1, 2)
+
+    def cross(o:tuple, p:tuple, q:tuple) -> float:
+        return (p[0] - o[0]) * (q[1] - o[1]) - (p[1] - o[1]) * (q[0] - o[0])
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+
+    upper = []
+    for point in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return np.array(lower[:-1] + upper[:-1], dtype=float)
+
+
+def split_polygon(polygon:np.ndarray, a:float, b:float) -> list:
+    '''
+    Splits the convex polygon by the line y = a*x + b. New vertices are rounded like intersection points of the Graph.
+
+    Returns list of polygons (np.ndarrays of shape (number of vertices, 2)) - the polygon itself
+    if the line does not cross it, the parts below and above the line otherwise.
+    '''
+
+    heights = polygon[:, 1] - (a * polygon[:, 0] + b)
+    if not (heights.max() > ON_LINE_TOLERANCE and heights.min() < -ON_LINE_TOLERANCE):
+        return [polygon]
+
+    below = []
+    above = []
+    num_of_verts = len(polygon)
+
+    for i in range(num_of_verts):
+        j = (i + 1) % num_of_verts
+        height_i = heights[i]
+        height_j = heights[j]
+
+        if height_i <= ON_LINE_TOLERANCE:
+            below.append(polygon[i])
+        if height_i >= -ON_LINE_TOLERANCE:
+            above.append(polygon[i])
+
+        # the side crosses the line between its ends
+        if (height_i < -ON_LINE_TOLERANCE and height_j > ON_LINE_TOLERANCE) or \
+           (height_i > ON_LINE_TOLERANCE and height_j < -ON_LINE_TOLERANCE):
+            t = height_i / (height_i - height_j)
+            point = np.round(polygon[i] + t * (polygon[j] - polygon[i]), COORDS_DECIMALS)
+            below.append(point)
+            above.append(point)
+
+    return [np.array(below), np.array(above)]
+
+
+def polygons_to_arrays(polygons:list) -> tuple:
+    '''
+    Concatenates vertices of polygons (np.ndarrays of shape (number of vertices, 2)) into one array.
+
+    Returns (coords, offsets), see `area_utils.polys_to_arrays`.
+    '''
+
+    offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(polygon) for polygon in polygons], out=offsets[1:])
+    coords = np.concatenate(polygons).reshape(-1, 2) if len(polygons) != 0 else np.zeros((0, 2))
+
+    return coords, offsets
+
+
+def get_faces_subset(coords:np.ndarray, offsets:np.ndarray, is_chosen:np.ndarray) -> tuple:
+    '''
+    Chooses faces with True in `is_chosen` from arrays of faces.
+
+    Returns (coords, offsets) of the chosen faces.
+    '''
+
+    sizes = np.diff(offsets)
+    subset_offsets = np.zeros(int(is_chosen.sum()) + 1, dtype=np.int64)
+    np.cumsum(sizes[is_chosen], out=subset_offsets[1:])
+
+    return coords[np.repeat(is_chosen, sizes)], subset_offsets
+
+
+def get_merged_groups(coords:np.ndarray, offsets:np.ndarray, removed_edges_points:list) -> list:
+    '''
+    Joins faces lying on both sides of segments of removed edges (union-find over faces).
+    A side of a face lies on an edge if both its ends are points of the edge.
+
+    Takes `coords`, `offsets` (see `area_utils.polys_to_arrays`) and `removed_edges_points`:list of sets of coords
+    (ends and intersection points of every removed edge).
+
+    Returns list of groups (lists of faces ids) - faces having sides on removed edges.
+    '''
+
+    edges_by_points = {}
+    for i, points in enumerate(removed_edges_points):
+        for point in points:
+            edges_by_points.setdefault(point, set()).add(i)
+
+    parents = {}
+
+    def find(face:int) -> int:
+        while parents[face] != face:
+            parents[face] = parents[parents[face]]
+            face = parents[face]
+        return face
+
+    # only faces with at least two vertices on removed edges are checked one by one
+    points = coords[:, 0] + 1j * coords[:, 1]
+    removed_points = np.array([complex(*point) for point in edges_by_points], dtype=complex)
+    is_removed_point = np.isin(points, removed_points)
+    counts = np.add.reduceat(is_removed_point.astype(np.int64), offsets[:-1]) if len(offsets) > 1 else np.zeros(0)
+
+    faces_by_segments = {}
+    for face in np.flatnonzero(counts >= 2).tolist():
+        verts = [tuple(vert) for vert in coords[offsets[face]:offsets[face+1]].tolist()]
+
+        for i in range(len(verts)):
+            point_1 = verts[i]
+            point_2 = verts[(i + 1) % len(verts)]
+            if point_1 == point_2:
+                continue
+
+            for edge in edges_by_points.get(point_1, set()) & edges_by_points.get(point_2, set()):
+                faces_by_segments.setdefault((edge, frozenset([point_1, point_2])), []).append(face)
+
+    for faces in faces_by_segments.values():
+        for face in faces:
+            parents.setdefault(face, face)
+        for face in faces[1:]:
+            parents[find(face)] = find(faces[0])
+
+    groups = {}
+    for face in parents:
+        groups.setdefault(find(face), []).append(face)
+
+    return list(groups.values())
+
+
+def get_faces_changes(faces:dict, removed_edges_points:list, removed_coefs:tuple, added_coefs:tuple,
+                      new_coefs:tuple) -> dict:
+    '''
+    Finds faces of the graph removed and added when edges are removed and added.
+
+    Takes `faces`:dict - faces of the graph (see `Graph.get_faces_arrays`), `removed_edges_points`:list
+    (see `get_merged_groups`) and lines coefficients (a, b) - np.ndarrays of removed edges, added edges
+    and all edges of the changed graph.
+
+    Returns dict:
+        "removed" - np.ndarray of bools, True for removed faces of the graph;
+        "added" - added faces, dict like `Graph.get_faces_arrays` ("coords", "offsets", "levels", "areas");
+        "levels_shifts" - np.ndarray of ints, the change of the level of every face which is not removed.
+    '''
+
+    coords = faces["coords"]
+    offsets = faces["offsets"]
+    num_of_faces = len(offsets) - 1
+
+    groups = get_merged_groups(coords, offsets, removed_edges_points)
+    is_removed = np.zeros(num_of_faces, dtype=bool)
+    for group in groups:
+        is_removed[group] = True
+
+    # faces crossed by added edges are split
+    for a, b in zip(*added_coefs):
+        is_above, is_below = get_faces_sides_of_line(coords, offsets, a, b)
+        is_crossed = is_above & is_below & ~is_removed
+        groups.extend([face] for face in np.flatnonzero(is_crossed).tolist())
+        is_removed |= is_crossed
+
+    new_polygons = []
+    for group in groups:
+        if len(group) == 1:
+            region = coords[offsets[group[0]]:offsets[group[0]+1]]
+        else:
+            region = get_convex_hull(np.concatenate([coords[offsets[face]:offsets[face+1]] for face in group]))
+
+        pieces = [region]
+        for a, b in zip(*added_coefs):
+            pieces = [part for piece in pieces for part in split_polygon(piece, a, b)]
+        new_polygons.extend(piece for piece in pieces if len(piece) >= 3)
+
+    # parts thinner than the tolerance are dropped
+    new_coords, new_offsets = polygons_to_arrays(new_polygons)
+    is_face = get_areas(new_coords, new_offsets) > 0
+    new_coords, new_offsets = polygons_to_arrays([polygon for polygon, is_kept in zip(new_polygons, is_face) if is_kept])
+    new_areas = get_areas(new_coords, new_offsets)
+
+    # levels are numbers of edges below points inside faces
+    new_levels = count_lines_below(get_centroids(new_coords, new_offsets), *new_coefs)
+    centroids = get_centroids(coords, offsets)
+    levels_shifts = count_lines_below(centroids, *added_coefs) - count_lines_below(centroids, *removed_coefs)
+    levels_shifts[is_removed] = 0
+
+    return {
+        "removed": is_removed,
+        "added": {
+            "coords": new_coords,
+            "offsets": new_offsets,
+            "levels": new_levels.astype(np.int64),
+            "areas": new_areas,
+        },
+        "levels_shifts": levels_shifts.astype(np.int64),
+    }
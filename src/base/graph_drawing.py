@@ -0,0 +1,105 @@
+"""
+Drawing of the Graph with matplotlib. Imported by the Graph only when the graph is drawn,
+so computations do not need matplotlib.
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import settings
+
+
+
+def draw(graph, edges:bool=True, intersections:bool=False, polygons:bool=False, frame:bool=False) -> plt:
+    '''
+    Draws the graph using matplotlib.
+
+    Returns the figure:plt.
+    '''
+    n = graph.NUM_OF_VERTS
+
+    fig = plt.figure(figsize=(8, 8))
+    ax = fig.add_subplot()
+    ax.grid()
+
+    points = [i for i in range(n)]
+
+    ax.scatter(x=[0 for i in range(n)], y=points, **settings.right_side_points)
+    ax.scatter(x=[n-1 for i in range(n)], y=points, **settings.left_side_points)
+
+    if edges and not (graph.edges is None):
+        add_edges_to_draw(graph, ax)
+    if intersections and not (graph.edges is None):
+        add_intersections_to_draw(graph, ax)
+    if polygons and not (graph.edges is None):
+        add_polygons_to_draw(graph)
+    if frame:
+        add_frame_to_draw(graph, ax)
+
+    
+    return plt
+
+
+def add_edges_to_draw(graph, ax) -> None:
+    '''
+    Adds edges to axes.
+    
+    Returns None.
+    '''
+
+    for edge in graph.edges:
+        x = [0, graph.NUM_OF_VERTS-1]
+        y = [edge.end_points[0].y, edge.end_points[1].y]
+        ax.plot(x, y, **settings.graph_edges_lines)
+
+
+def add_intersections_to_draw(graph, ax) -> None:
+    '''
+    Adds intersection points to axes.
+    
+    Returns None.
+    '''
+
+    x = []
+    y = []
+
+    for point in graph.intersection_points:
+        x.append(point.x)
+        y.append(point.y)
+
+
+    ax.scatter(x, y, **settings.intersection_points)
+
+
+def add_polygons_to_draw(graph) -> None:
+    '''
+    Adds colored polygons to plt.
+    
+    Returns None.
+    '''
+
+    even_levels_polys = graph.get_odd_or_even_levels_polys("even")
+    odd_levels_polys = graph.get_odd_or_even_levels_polys("odd")
+
+    for poly in even_levels_polys:
+        X = np.array([list(point.coords) for point in poly.verts])
+        t1 = plt.Polygon(X, **settings.first_level_polygons)
+        plt.gca().add_patch(t1)
+        
+    for poly in odd_levels_polys:
+        X = np.array([list(point.coords) for point in poly.verts])
+        t1 = plt.Polygon(X, **settings.second_level_polygons)
+        plt.gca().add_patch(t1)
+    
+
+def add_frame_to_draw(graph, ax) -> None:
+    '''
+    Adds fame to axes.
+    
+    Returns None.
+    '''
+
+    n = graph.NUM_OF_VERTS
+    x = [0, 0, n-1, n-1, 0]
+    y = [0, n-1, n-1, 0, 0]
+    ax.plot(x, y, **settings.frame_lines)
@@ -0,0 +1,153 @@
+"""
+Streaming export of graph faces (polygons of levels) to SVG, GeoJSON and WKB files.
+
+Faces are written level by level straight from `graph_levels` (or from `iter_graph_levels`
+if levels are not kept), so the whole document is never built in memory.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+import settings
+
+from base.the_graph import Graph
+from base.area_utils import polys_to_arrays, get_signed_areas
+
+
+COORDS_FORMAT = "%.10g"
+
+WKB_LITTLE_ENDIAN = 1
+WKB_POLYGON = 3
+WKB_MULTI_POLYGON = 6
+WKB_GEOMETRY_COLLECTION = 7
+
+
+
+def iter_levels_rings(graph:Graph):
+    '''
+    Walks through levels of the graph.
+
+    Yields (level:int, coords:np.ndarray, offsets:np.ndarray) - closed (the first vertex is repeated
+    at the end) counterclockwise polygons of the level, vertices of the i-th polygon
+    are coords[offsets[i]:offsets[i+1]].
+    '''
+
+    with graph.lock:
+        graph_levels = graph.graph_levels if graph.graph_levels is not None else graph.iter_graph_levels()
+
+        for level in graph_levels:
+            coords, offsets = polys_to_arrays(level.get("polygons"))
+            is_clockwise = get_signed_areas(coords, offsets) < 0
+
+            # the k-th vertex of the closed ring is the (k mod size)-th vertex of the polygon,
+            # clockwise polygons are walked backwards from the same first vertex
+            sizes = np.maximum(np.diff(offsets), 1)
+            closed_offsets = offsets + np.arange(len(offsets))
+            polys_ids = np.repeat(np.arange(len(sizes)), sizes + 1)
+            positions = np.arange(closed_offsets[-1]) - closed_offsets[polys_ids]
+            positions = np.where(is_clockwise[polys_ids], -positions, positions) % sizes[polys_ids]
+
+            closed_coords = coords[offsets[polys_ids] + positions] if len(coords) != 0 else coords
+
+            yield level.get("level"), closed_coords, closed_offsets
+
+
+def write_svg(graph:Graph, path:str, size:int=1000) -> None:
+    '''
+    Writes faces of the graph to SVG file as paths, one group per level.
+    Even and odd levels are coloured as in settings.py.
+
+    Takes `graph`:Graph, `path`:str and `size`:int (width and height of the image in pixels).
+
+    Returns None.
+    '''
+
+    n = graph.NUM_OF_VERTS
+    colors = [get_svg_color(settings.first_level_polygons.get("color")),
+              get_svg_color(settings.second_level_polygons.get("color"))]
+
+    with open(path, "w") as file:
+        file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {n-1} {n-1}">\n')
+        # y axis of the graph goes up, y axis of SVG goes down
+        file.write(f'<g transform="matrix(1 0 0 -1 0 {n-1})" stroke="none">\n')
+
+        for level, coords, offsets in iter_levels_rings(graph):
+            points = [" ".join(point) for point in np.char.mod(COORDS_FORMAT, coords).tolist()]
+
+            file.write(f'<g id="level-{level}" fill="{colors[level % 2]}">\n')
+            for i in range(len(offsets) - 1):
+                # points after the first one are joined by lines (implicit "L"), the closing point is skipped
+                file.write('<path d="M' + " ".join(points[offsets[i]:offsets[i+1]-1]) + 'Z"/>\n')
+            file.write('</g>\n')
+
+        file.write('</g>\n</svg>\n')
+
+
+def write_geojson(graph:Graph, path:str) -> None:
+    '''
+    Writes faces of the graph to GeoJSON file (FeatureCollection).
+    Every face is a Polygon feature with the `level` property.
+
+    Returns None.
+    '''
+
+    with open(path, "w") as file:
+        file.write('{"type": "FeatureCollection", "features": [\n')
+        separator = ""
+
+        for level, coords, offsets in iter_levels_rings(graph):
+            # features are formatted by hand, json.dumps of every feature is several times slower
+            points = ["[" + ", ".join(point) + "]" for point in np.char.mod(COORDS_FORMAT, coords).tolist()]
+            properties = json.dumps({"level": level})
+
+            for i in range(len(offsets) - 1):
+                file.write(separator + '{"type": "Feature", "properties": ' + properties
+                           + ', "geometry": {"type": "Polygon", "coordinates": [['
+                           + ", ".join(points[offsets[i]:offsets[i+1]]) + ']]}}')
+                separator = ",\n"
+
+        file.write('\n]}\n')
+
+
+def write_wkb(graph:Graph, path:str) -> None:
+    '''
+    Writes faces of the graph to binary WKB file (little endian): GeometryCollection
+    whose i-th geometry is MultiPolygon of faces of the i-th level.
+    The number of levels is written at the end, when it is known.
+
+    Returns None.
+    '''
+
+    with open(path, "wb") as file:
+        file.write(struct.pack("<BII", WKB_LITTLE_ENDIAN, WKB_GEOMETRY_COLLECTION, 0))
+        num_of_levels = 0
+
+        for level, coords, offsets in iter_levels_rings(graph):
+            coords = np.ascontiguousarray(coords, dtype="<f8")
+
+            file.write(struct.pack("<BII", WKB_LITTLE_ENDIAN, WKB_MULTI_POLYGON, len(offsets) - 1))
+            for i in range(len(offsets) - 1):
+                # polygon with one ring
+                file.write(struct.pack("<BIII", WKB_LITTLE_ENDIAN, WKB_POLYGON, 1, offsets[i+1] - offsets[i]))
+                file.write(coords[offsets[i]:offsets[i+1]].tobytes())
+            num_of_levels += 1
+
+        file.seek(struct.calcsize("<BI"))
+        file.write(struct.pack("<I", num_of_levels))
+
+
+def get_svg_color(color) -> str:
+    '''
+    Changes color from settings.py to SVG color - names are used as they are,
+    tuples of floats from [0, 1] are changed to "rgb(r, g, b)".
+
+    Returns str.
+    '''
+
+    if isinstance(color, str):
+        return color
+
+    red, green, blue = [int(round(255 * value)) for value in color[:3]]
+    return f"rgb({red}, {green}, {blue})"
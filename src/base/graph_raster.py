@@ -0,0 +1,223 @@
+import struct
+import zlib
+
+import numpy as np
+
+import settings
+
+from base.the_graph import Graph
+
+
+MAX_CHUNK_ELEMENTS = 2**22  # bounds the memory used by a single chunk of columns
+
+
+
+def rasterize_graph(graph:Graph, width:int=1000, height:int=None, mode:str="parity", edges:bool=True,
+                    intersections:bool=False, cmap:str="viridis") -> np.ndarray:
+    '''
+    Draws the graph directly into an image buffer, without creating any matplotlib patch.
+
+    Faces are filled column by column (scanline filling): in every pixel column the level of a pixel
+    is the number of graph edges lying below the pixel centre. Edges and intersections are drawn
+    as overlays decimated to the image resolution.
+
+    Takes `graph`:Graph, `width`:int and `height`:int (in pixels, height equals width by default),
+    `mode`:str ("parity" - even/odd faces coloured as in settings.py, "levels" - colour depends
+    on the level, taken from `cmap`), `edges`:bool, `intersections`:bool.
+
+    Returns the RGBA image as np.ndarray of shape (height, width, 4) and type uint8.
+    '''
+
+    if mode not in ["parity", "levels"]:
+        raise Exception(f"`mode` must be 'parity' or 'levels', now it's {mode}.")
+    if height is None:
+        height = width
+    if not (isinstance(width, int) and isinstance(height, int)) or width < 1 or height < 1:
+        raise Exception(f"`width` and `height` must be positive ints, now they are {width} and {height}.")
+
+    n = graph.NUM_OF_VERTS
+    coefs = get_edges_coefs(graph)
+    image = np.empty((height, width, 4), dtype=np.uint8)
+
+    palette = get_palette(mode, len(coefs) + 1, cmap)
+    edges_color = to_rgba_bytes(settings.graph_edges_lines["color"])
+
+    # x coordinates of columns centres and y coordinates of rows centres (row 0 is the top of the square)
+    pixel_width = (n-1) / width
+    pixel_height = (n-1) / height
+    columns_x = (np.arange(width) + 0.5) * pixel_width
+
+    chunk_size = max(1, MAX_CHUNK_ELEMENTS // (height + len(coefs) + 1))
+
+    for start in range(0, width, chunk_size):
+        stop = min(start + chunk_size, width)
+        x = columns_x[start:stop]
+
+        levels = get_columns_levels(coefs, x, height, pixel_height)
+        image[:, start:stop] = palette[levels].transpose(1, 0, 2)
+
+        if edges and len(coefs) != 0:
+            mask = get_columns_edges_mask(coefs, x, pixel_width, height, pixel_height)
+            image[:, start:stop][mask.T] = edges_color
+
+    if intersections:
+        points = np.array([point.coords for point in graph.intersection_points], dtype=float).reshape(-1, 2)
+        add_points_to_image(image, points, n, to_rgba_bytes(settings.intersection_points["color"]))
+
+    return image
+
+
+def save_graph_png(graph:Graph, path:str, **kwargs) -> None:
+    '''
+    Rasterizes the graph (see `rasterize_graph`, which takes the same keyword arguments) and saves it as PNG.
+
+    Returns None.
+    '''
+
+    write_png(rasterize_graph(graph, **kwargs), path)
+
+
+def get_edges_coefs(graph:Graph) -> np.ndarray:
+    '''
+    Returns np.ndarray of shape (number of edges, 2) with line coefficients (a, b) of graph edges.
+    '''
+
+    edges = graph.edges if graph.edges is not None else []
+    return np.array([edge.line_coefs for edge in edges], dtype=float).reshape(-1, 2)
+
+
+def get_columns_levels(coefs:np.ndarray, x:np.ndarray, height:int, pixel_height:float) -> np.ndarray:
+    '''
+    Scanline filling: every edge increases the level of all pixels above it in the column,
+    so the levels are the cumulative sums of edges crossings counted per row.
+
+    Returns levels of pixels as np.ndarray of shape (number of columns, height), row 0 is the top.
+    '''
+
+    if len(coefs) != 0:
+        heights = coefs[:, 0] * x[:, None] + coefs[:, 1]
+        # index of the first row (counting from the bottom) having its centre above the edge
+        rows = np.ceil(heights / pixel_height - 0.5).astype(np.int64)
+        np.clip(rows, 0, height, out=rows)
+        counts = count_in_columns(rows, height + 1)
+    else:
+        counts = np.zeros((len(x), height + 1), dtype=np.int64)
+
+    levels = np.cumsum(counts[:, :height], axis=1)
+    return levels[:, ::-1]
+
+
+def get_columns_edges_mask(coefs:np.ndarray, x:np.ndarray, pixel_width:float, height:int,
+                           pixel_height:float) -> np.ndarray:
+    '''
+    Marks pixels covered by edges. In every column an edge covers the rows between its heights
+    on the left and right border of the column, so steep edges have no gaps.
+
+    Returns bool np.ndarray of shape (number of columns, height), row 0 is the top.
+    '''
+
+    heights_left = coefs[:, 0] * (x[:, None] - pixel_width/2) + coefs[:, 1]
+    heights_right = coefs[:, 0] * (x[:, None] + pixel_width/2) + coefs[:, 1]
+
+    rows_from = np.floor(np.minimum(heights_left, heights_right) / pixel_height).astype(np.int64)
+    rows_to = np.floor(np.maximum(heights_left, heights_right) / pixel_height).astype(np.int64) + 1
+    np.clip(rows_from, 0, height, out=rows_from)
+    np.clip(rows_to, 0, height, out=rows_to)
+
+    counts = count_in_columns(rows_from, height + 1) - count_in_columns(rows_to, height + 1)
+
+    mask = np.cumsum(counts[:, :height], axis=1) > 0
+    return mask[:, ::-1]
+
+
+def count_in_columns(rows:np.ndarray, num_of_rows:int) -> np.ndarray:
+    '''
+    Counts how many times every row index occurs in every column of `rows` (shape: (number of columns, k)).
+
+    Returns np.ndarray of shape (number of columns, `num_of_rows`).
+    '''
+
+    indexes = rows + np.arange(len(rows))[:, None] * num_of_rows
+    counts = np.bincount(indexes.ravel(), minlength=len(rows) * num_of_rows)
+    return counts.reshape(len(rows), num_of_rows)
+
+
+def add_points_to_image(image:np.ndarray, points:np.ndarray, n:int, color:np.ndarray, radius:int=1) -> None:
+    '''
+    Draws points as small squares. Points falling into the same pixel are drawn once.
+
+    Returns None.
+    '''
+
+    height, width = image.shape[:2]
+    if len(points) == 0:
+        return
+
+    columns = np.clip((points[:, 0] / (n-1) * width).astype(np.int64), 0, width-1)
+    rows = np.clip(height - 1 - (points[:, 1] / (n-1) * height).astype(np.int64), 0, height-1)
+    pixels = np.unique(np.stack([rows, columns], axis=1), axis=0)
+
+    for d_row in range(-radius, radius+1):
+        for d_column in range(-radius, radius+1):
+            image[np.clip(pixels[:, 0] + d_row, 0, height-1), np.clip(pixels[:, 1] + d_column, 0, width-1)] = color
+
+
+def get_palette(mode:str, num_of_levels:int, cmap:str) -> np.ndarray:
+    '''
+    Returns np.ndarray of shape (number of levels, 4) with RGBA colors of the levels.
+    '''
+
+    if mode == "parity":
+        even_color = to_rgba_bytes(settings.first_level_polygons["color"])
+        odd_color = to_rgba_bytes(settings.second_level_polygons["color"])
+        palette = np.empty((num_of_levels, 4), dtype=np.uint8)
+        palette[0::2] = even_color
+        palette[1::2] = odd_color
+        return palette
+
+    import matplotlib
+
+    colormap = matplotlib.colormaps[cmap]
+    values = np.linspace(0, 1, num_of_levels) if num_of_levels > 1 else np.zeros(1)
+    return (colormap(values) * 255).round().astype(np.uint8)
+
+
+def to_rgba_bytes(color) -> np.ndarray:
+    '''
+    Changes matplotlib color (i.e. name) into RGBA bytes.
+
+    Returns np.ndarray of shape (4,) and type uint8.
+    '''
+
+    from matplotlib.colors import to_rgba
+
+    return (np.array(to_rgba(color)) * 255).round().astype(np.uint8)
+
+
+def write_png(image:np.ndarray, path:str) -> None:
+    '''
+    Writes RGBA image (np.ndarray of shape (height, width, 4) and type uint8) as PNG file.
+    Rows are compressed one by one, so no additional copy of the image is made.
+
+    Returns None.
+    '''
+
+    if image.ndim != 3 or image.shape[2] != 4 or image.dtype != np.uint8:
+        raise Exception(f"`image` must be uint8 np.ndarray of shape (height, width, 4), now it's {image.dtype} {image.shape}.")
+
+    height, width = image.shape[:2]
+
+    def chunk(chunk_type:bytes, data:bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    compressor = zlib.compressobj()
+    data = []
+    for row in image:
+        data.append(compressor.compress(b"\x00" + row.tobytes()))
+    data.append(compressor.flush())
+
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        file.write(chunk(b"IDAT", b"".join(data)))
+        file.write(chunk(b"IEND", b""))
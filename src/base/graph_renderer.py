@@ -0,0 +1,329 @@
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+import settings
+
+from base.the_graph import Graph
+
+
+VIDEO_EXTENSIONS = [".mp4", ".avi", ".mov", ".mkv", ".webm"]
+
+
+
+class GraphRenderer():
+    '''
+    Persistent renderer bound to a Graph.
+
+    Unlike `Graph.draw`, which builds a new figure every call, the renderer creates its figure once
+    and keeps its matplotlib artists. After `graph.set_edges` only the changed edge lines,
+    the intersection scatter offsets and the polygon collections are updated.
+    '''
+
+    def __init__(self, graph:Graph, intersections:bool=True, polygons:bool=True, frame:bool=True,
+                 blit:bool=False, ax=None, figsize:tuple=(8, 8), dpi:int=100):
+        '''
+        Takes `graph`:Graph and drawing options (the same as in `Graph.draw`).
+        Edges are always drawn.
+
+        `blit`:bool - redraw only the changing artists on top of a cached background.
+        `ax` - matplotlib axes to draw on; if None a headless (Agg) figure is created.
+        '''
+
+        if not isinstance(graph, Graph):
+            raise Exception(f"`graph` must be of type Graph, now it is {type(graph)}.")
+
+        self.graph = graph
+        self.intersections = intersections
+        self.polygons = polygons
+        self.blit = blit
+
+        if ax is None:
+            fig = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+
+        self.ax = ax
+        self.fig = ax.figure
+        self.canvas = self.fig.canvas
+        self.background = None
+        self.needs_render = True
+
+        self.static_artists = []
+        self.edges_lines = {}
+        self.intersections_scatter = None
+        self.polygons_collections = []
+
+        self.add_static_artists(frame)
+        self.add_dynamic_artists()
+        self.update()
+
+        if self.blit:
+            self.canvas.mpl_connect("draw_event", self.on_draw)
+
+
+    def add_static_artists(self, frame:bool) -> None:
+        '''
+        Adds artists which do not depend on graph edges - vertices and frame.
+
+        Returns None.
+        '''
+
+        n = self.graph.NUM_OF_VERTS
+        points = [i for i in range(n)]
+
+        self.ax.grid()
+        self.static_artists.append(self.ax.scatter(x=[0 for i in range(n)], y=points, **settings.right_side_points))
+        self.static_artists.append(self.ax.scatter(x=[n-1 for i in range(n)], y=points, **settings.left_side_points))
+
+        if frame:
+            x = [0, 0, n-1, n-1, 0]
+            y = [0, n-1, n-1, 0, 0]
+            self.static_artists += self.ax.plot(x, y, **settings.frame_lines)
+
+
+    def add_dynamic_artists(self) -> None:
+        '''
+        Creates (empty) artists updated by `update`.
+
+        Returns None.
+        '''
+
+        if self.intersections:
+            self.intersections_scatter = self.ax.scatter([], [], animated=self.blit, **settings.intersection_points)
+
+        if self.polygons:
+            for polygons_settings in [settings.first_level_polygons, settings.second_level_polygons]:
+                collection = PolyCollection([], animated=self.blit, **polygons_settings)
+                self.ax.add_collection(collection)
+                self.polygons_collections.append(collection)
+
+
+    def get_dynamic_artists(self) -> list:
+        '''
+        Returns list of artists changing together with graph edges.
+        '''
+
+        artists = self.polygons_collections + list(self.edges_lines.values())
+        if self.intersections_scatter is not None:
+            artists.append(self.intersections_scatter)
+
+        return artists
+
+
+    # update section
+    def update(self) -> None:
+        '''
+        Updates artists after the graph edges have changed (`graph.set_edges`).
+        Only lines of added or deleted edges are changed.
+
+        Returns None.
+        '''
+
+        with self.graph.lock:
+            self.update_edges()
+            if self.intersections:
+                self.update_intersections()
+            if self.polygons:
+                self.update_polygons()
+
+        self.needs_render = True
+        if self.blit and self.background is not None:
+            self.blit_dynamic_artists()
+
+
+    def update_edges(self) -> None:
+        '''
+        Adds lines of new edges and removes lines of deleted edges.
+
+        Returns None.
+        '''
+
+        n = self.graph.NUM_OF_VERTS
+        edges = self.graph.edges if self.graph.edges is not None else []
+        new_keys = set((edge.end_points[0].y, edge.end_points[1].y) for edge in edges)
+
+        for key in [key for key in self.edges_lines if key not in new_keys]:
+            self.edges_lines.pop(key).remove()
+
+        for key in new_keys:
+            if key not in self.edges_lines:
+                line, = self.ax.plot([0, n-1], list(key), animated=self.blit, **settings.graph_edges_lines)
+                self.edges_lines[key] = line
+
+
+    def update_intersections(self) -> None:
+        '''
+        Sets offsets of the intersection points scatter.
+
+        Returns None.
+        '''
+
+        offsets = np.array([point.coords for point in self.graph.intersection_points], dtype=float)
+        self.intersections_scatter.set_offsets(offsets.reshape(-1, 2))
+
+
+    def update_polygons(self) -> None:
+        '''
+        Sets vertices of even and odd levels polygons collections.
+
+        Returns None.
+        '''
+
+        if self.graph.edges is None:
+            return
+
+        for collection, mode in zip(self.polygons_collections, ["even", "odd"]):
+            polys = self.graph.get_odd_or_even_levels_polys(mode)
+            collection.set_verts([[point.coords for point in poly.verts] for poly in polys])
+
+
+    # blitting section
+    def on_draw(self, event) -> None:
+        '''
+        Caches the background (everything but the dynamic artists) after a full redraw.
+
+        Returns None.
+        '''
+
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_dynamic_artists()
+
+
+    def draw_dynamic_artists(self) -> None:
+        '''
+        Draws dynamic artists on the cached background together with static artists
+        that should be on top of them (higher z-order), so blitted frames look like full redraws.
+
+        Returns None.
+        '''
+
+        dynamic_artists = self.get_dynamic_artists()
+        if len(dynamic_artists) == 0:
+            return
+
+        min_zorder = min(artist.get_zorder() for artist in dynamic_artists)
+        artists = dynamic_artists + [artist for artist in self.static_artists if artist.get_zorder() > min_zorder]
+
+        for artist in sorted(artists, key=lambda artist: artist.get_zorder()):
+            self.ax.draw_artist(artist)
+
+
+    def blit_dynamic_artists(self) -> None:
+        '''
+        Restores cached background and redraws only the dynamic artists.
+
+        Returns None.
+        '''
+
+        self.canvas.restore_region(self.background)
+        self.draw_dynamic_artists()
+        self.canvas.blit(self.fig.bbox)
+        self.needs_render = False
+
+
+    # export section
+    def render(self) -> None:
+        '''
+        Renders the current state of the graph to the canvas (if it has changed since the last rendering).
+
+        Returns None.
+        '''
+
+        if not self.needs_render:
+            return
+
+        if self.blit and self.background is not None:
+            self.blit_dynamic_artists()
+        else:
+            self.canvas.draw()
+            self.needs_render = False
+
+
+    def get_frame(self) -> np.ndarray:
+        '''
+        Renders the current state of the graph.
+
+        Returns RGBA image as np.ndarray of shape (height, width, 4).
+        '''
+
+        self.render()
+        return np.array(self.canvas.buffer_rgba())
+
+
+    def save_frame(self, path:str) -> None:
+        '''
+        Saves the current state of the graph as an image (format taken from the file extension).
+
+        Returns None.
+        '''
+
+        from matplotlib.image import imsave
+
+        imsave(path, self.get_frame())
+
+
+    def record(self, edges_sets, path:str, fps:int=30) -> int:
+        '''
+        Sets every edges list from `edges_sets` in the graph and saves frame after each of them.
+
+        Takes `edges_sets`:iterable of edges lists, `path`:str and `fps`:int.
+        If `path` has video extension (.mp4, .avi, ...) frames are piped to ffmpeg,
+        otherwise `path` is a directory where frames are saved as `frame_00000.png`, ...
+
+        Returns number of saved frames:int.
+        '''
+
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            return self.record_video(edges_sets, path, fps)
+
+        os.makedirs(path, exist_ok=True)
+        num_of_frames = 0
+        for edges in edges_sets:
+            self.graph.set_edges(edges)
+            self.update()
+            self.save_frame(os.path.join(path, f"frame_{num_of_frames:05d}.png"))
+            num_of_frames += 1
+
+        return num_of_frames
+
+
+    def record_video(self, edges_sets, path:str, fps:int) -> int:
+        '''
+        Pipes raw RGBA frames to ffmpeg, which encodes them into a video file.
+
+        Returns number of saved frames:int.
+        '''
+
+        import matplotlib
+
+        ffmpeg = shutil.which(matplotlib.rcParams["animation.ffmpeg_path"])
+        if ffmpeg is None:
+            raise Exception(f"ffmpeg has not been found, video cannot be saved. Save frames to a directory instead.")
+
+        width, height = self.canvas.get_width_height(physical=True)
+        command = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", path
+        ]
+
+        num_of_frames = 0
+        with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+            for edges in edges_sets:
+                self.graph.set_edges(edges)
+                self.update()
+                self.render()
+                process.stdin.write(self.canvas.buffer_rgba())
+                num_of_frames += 1
+            process.stdin.close()
+
+        if process.returncode != 0:
+            raise Exception(f"ffmpeg exited with code {process.returncode}.")
+
+        return num_of_frames
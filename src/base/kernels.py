@@ -0,0 +1,328 @@
+"""
+Numeric kernels of the hot loops: intersections of edges and choosing the next point of a polygon.
+
+Every kernel is written once, as a plain function working on indexable sequences, and it handles
+the whole batch (all pairs of lines, all points of the graph) in one call. The pure Python backend runs
+them on lists and is the default. If numba is installed (`pip install numba`), `set_backend("numba")`
+compiles the same functions and runs them on numpy arrays - both backends give identical results.
+Areas of polygons are computed in one batch by `area_utils.get_areas`.
+"""
+
+import importlib
+import importlib.util
+import threading
+from math import acos, pi
+
+import numpy as np
+
+
+PYTHON_BACKEND = "python"
+NUMBA_BACKEND = "numba"
+MAX_BLOCK_PAIRS = 2**16  # pairs of lines checked in one call of the intersections kernel (the budget is checked between calls)
+
+
+
+# kernels section
+def edge_intersections_kernel(left, right, start, stop, upper, out_counts, out_x, out_y):
+    '''
+    Finds intersection points of lines from `start` to `stop` (excluding) with all lines (going through
+    (0, left[j]) and (upper, right[j])) lying strictly inside the interval (0, `upper`) of the x axis.
+    Ends are integers, so both coordinates are computed by one division of exact numbers - all lines
+    going through one point get exactly the same coordinates of it.
+
+    Writes the number of points of the i-th line to out_counts[i - start] and coordinates to `out_x`, `out_y`
+    (line after line, in order of lines) and returns the number of all points.
+    '''
+
+    eps = 10**(-5)  # computation error
+    count = 0
+
+    for i in range(start, stop):
+        b_0 = left[i]
+        d_0 = right[i] - left[i]
+        line_count = 0
+
+        for j in range(len(left)):
+            b_1 = left[j]
+            d_1 = right[j] - left[j]
+
+            # if d_0 = d_1 - lines are parallel
+            if d_0 - d_1 != 0:
+                x_intersection = upper * (b_1 - b_0) / (d_0 - d_1)
+
+                if x_intersection < upper - eps and x_intersection > 0 + eps:
+                    y_intersection = (d_0 * b_1 - d_1 * b_0) / (d_0 - d_1)
+                    out_x[count + line_count] = x_intersection
+                    out_y[count + line_count] = y_intersection
+                    line_count += 1
+
+        out_counts[i - start] = line_count
+        count += line_count
+
+    return count
+
+
+def next_points_kernel(starts, ends_x, ends_y, points_x, points_y, offsets, candidates_x, candidates_y, out):
+    '''
+    Chooses the next point of a polygon for every step (start, end): the candidate of the start point
+    (other than the end point) making the smallest angle with the edge (start, end), with the cross product
+    oriented positively. The start of the q-th step is the point starts[q], its candidates are
+    candidates[offsets[starts[q]]:offsets[starts[q]+1]].
+
+    Writes to out[q] index of the chosen candidate (among candidates of the start point) or -1 if no candidate is good.
+    '''
+
+    for q in range(len(starts)):
+        start = starts[q]
+        start_x = points_x[start]
+        start_y = points_y[start]
+        end_x = ends_x[q]
+        end_y = ends_y[q]
+
+        vector_1_x = end_x - start_x
+        vector_1_y = end_y - start_y
+        length_1 = (vector_1_x**2 + vector_1_y**2)**0.5
+
+        index = -1
+        temp_angle = pi * 2
+
+        for k in range(offsets[start], offsets[start+1]):
+            if candidates_x[k] == end_x and candidates_y[k] == end_y:
+                continue
+
+            vector_2_x = candidates_x[k] - start_x
+            vector_2_y = candidates_y[k] - start_y
+            length_2 = (vector_2_x**2 + vector_2_y**2)**0.5
+
+            cos_value = (vector_1_x * vector_2_x + vector_1_y * vector_2_y) / (length_1 * length_2)
+            angle = acos(min(max(cos_value, -1.0), 1.0))
+            cross_product = vector_1_x * vector_2_y - vector_2_x * vector_1_y
+
+            if cross_product >= 0 and angle < temp_angle:
+                temp_angle = angle
+                index = k - offsets[start]
+
+        out[q] = index
+
+
+PYTHON_KERNELS = {
+    "edge_intersections": edge_intersections_kernel,
+    "next_points": next_points_kernel,
+}
+# numba is imported only when kernels are compiled (importing it is slow)
+is_numba_available = importlib.util.find_spec("numba") is not None
+compiled_kernels = None
+compile_lock = threading.Lock()
+backend = PYTHON_BACKEND  # numba is used only if it is chosen (see `set_backend`)
+
+
+
+# backend section
+def get_available_backends() -> list:
+    '''
+    Returns list of names of backends which can be used.
+    '''
+
+    if not is_numba_available:
+        return [PYTHON_BACKEND]
+    return [PYTHON_BACKEND, NUMBA_BACKEND]
+
+
+def get_backend() -> str:
+    '''
+    Returns name of the active backend ("python" or "numba").
+    '''
+
+    return backend
+
+
+def choose_backend(name:str=None) -> str:
+    '''
+    Chooses the backend of one call of the kernels, without changing the active backend
+    (so threads can use different backends at the same time).
+
+    Takes `name`:str ("python", "numba" or "auto" - numba if installed, python otherwise) or None - the active backend.
+
+    Returns name of the backend.
+    '''
+
+    if name is None:
+        return backend
+    if name == "auto":
+        name = NUMBA_BACKEND if is_numba_available else PYTHON_BACKEND
+
+    if name not in [PYTHON_BACKEND, NUMBA_BACKEND]:
+        raise Exception(f"`name` must be 'python', 'numba' or 'auto', now it's {name}.")
+    if name == NUMBA_BACKEND and not is_numba_available:
+        raise Exception(f"Backend 'numba' is not available, install numba first (`pip install numba`).")
+
+    return name
+
+
+def set_backend(name:str) -> None:
+    '''
+    Chooses the backend used by the kernels in the whole process (see `choose_backend` for one call).
+
+    Takes `name`:str ("python", "numba" or "auto" - numba if installed, python otherwise).
+
+    Returns None.
+    '''
+
+    global backend
+
+    if name is None:
+        raise Exception(f"`name` must be 'python', 'numba' or 'auto', now it's {name}.")
+
+    backend = choose_backend(name)
+
+
+def get_kernel(name:str, backend_name:str=None):
+    '''
+    Returns the kernel function for the backend `backend_name` (the active backend if None),
+    compiling numba kernels on first use.
+    '''
+
+    global compiled_kernels
+
+    if choose_backend(backend_name) == PYTHON_BACKEND:
+        return PYTHON_KERNELS[name]
+
+    with compile_lock:
+        if compiled_kernels is None:
+            numba = importlib.import_module("numba")
+            compiled_kernels = {key: numba.njit(cache=True)(kernel) for key, kernel in PYTHON_KERNELS.items()}
+
+    return compiled_kernels[name]
+
+
+def to_sequence(values:list, dtype=np.float64, backend_name:str=None):
+    '''
+    Changes list into the container used by the backend `backend_name` (list or np.ndarray).
+    '''
+
+    if choose_backend(backend_name) == PYTHON_BACKEND:
+        return values
+    return np.asarray(values, dtype=dtype)
+
+
+def get_zeros(size:int, dtype=np.float64, backend_name:str=None):
+    '''
+    Creates the container of `size` zeros used by the backend `backend_name` (list or np.ndarray).
+    '''
+
+    if choose_backend(backend_name) == PYTHON_BACKEND:
+        return [dtype(0).item()] * size
+    return np.zeros(size, dtype=dtype)
+
+
+def to_list(values) -> list:
+    '''
+    Changes the container used by the active backend (list or np.ndarray) into list of Python numbers.
+    '''
+
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return list(values)
+
+
+# dispatch section
+def get_edges_intersections(edges:list, upper:int, check=None, backend_name:str=None) -> list:
+    '''
+    Finds intersection points of every edge with the others, checking blocks of at most `MAX_BLOCK_PAIRS`
+    pairs of edges in one call of the kernel.
+
+    Takes `edges`:list of tuples (left, right) - ints, the edge goes from (0, left) to (`upper`, right),
+    `upper`:int - the end of the x interval and optionally `check` - function called with the number of edges
+    before every block (i.e. to stop long computations) and `backend_name`:str (see `choose_backend`).
+
+    Returns list (one element for every edge) of lists of intersection coords (x, y) rounded to 4 decimals.
+    '''
+
+    # chosen once, so the whole call uses one backend
+    backend_name = choose_backend(backend_name)
+    kernel = get_kernel("edge_intersections", backend_name)
+    num_of_lines = len(edges)
+    block_size = max(1, min(num_of_lines, MAX_BLOCK_PAIRS // max(1, num_of_lines)))
+
+    left = to_sequence([float(edge[0]) for edge in edges], backend_name=backend_name)
+    right = to_sequence([float(edge[1]) for edge in edges], backend_name=backend_name)
+    out_counts = get_zeros(block_size, dtype=np.int64, backend_name=backend_name)
+    out_x = get_zeros(block_size * num_of_lines, backend_name=backend_name)
+    out_y = get_zeros(block_size * num_of_lines, backend_name=backend_name)
+
+    intersections = []
+    for start in range(0, num_of_lines, block_size):
+        stop = min(start + block_size, num_of_lines)
+        if check is not None:
+            check(stop - start)
+
+        count = kernel(left, right, start, stop, float(upper), out_counts, out_x, out_y)
+        # rounded by Python, numba rounds some halves differently
+        coords = [(round(x, 4), round(y, 4)) for x, y in zip(to_list(out_x[:count]), to_list(out_y[:count]))]
+
+        position = 0
+        for line_count in to_list(out_counts[:stop - start]):
+            intersections.append(coords[position:position + line_count])
+            position += line_count
+
+    return intersections
+
+
+def get_next_points_indexes(points:list, candidates:list, backend_name:str=None) -> list:
+    '''
+    Chooses the next point of a polygon for every point and every its candidate the polygon can come from,
+    in one call of the kernel.
+
+    Takes `points`:list of coords, `candidates`:list (one element for every point) of lists of coords
+    and optionally `backend_name`:str (see `choose_backend`).
+
+    Returns list (one element for every point) of lists - the k-th element is the index (in candidates of the point)
+    of the next point of the polygon coming to the point from its k-th candidate, or -1.
+    '''
+
+    sizes = [len(point_candidates) for point_candidates in candidates]
+    offsets = [0]
+    for size in sizes:
+        offsets.append(offsets[-1] + size)
+
+    flat_candidates = [coords for point_candidates in candidates for coords in point_candidates]
+    starts = [i for i, size in enumerate(sizes) for _ in range(size)]
+    indexes = get_next_indexes(points, offsets, flat_candidates, starts, flat_candidates, backend_name)
+
+    return [indexes[offsets[i]:offsets[i+1]] for i in range(len(points))]
+
+
+def get_next_point_index(start:tuple, end:tuple, candidates:list, backend_name:str=None) -> int:
+    '''
+    Takes `start` and `end` coords of the last found polygon edge, `candidates`:list of coords
+    and optionally `backend_name`:str (see `choose_backend`).
+
+    Returns index of the next point of the polygon in `candidates` or -1.
+    '''
+
+    return get_next_indexes([start], [0, len(candidates)], candidates, [0], [end], backend_name)[0]
+
+
+def get_next_indexes(points:list, offsets:list, candidates:list, starts:list, ends:list, backend_name:str=None) -> list:
+    '''
+    Runs the next points kernel for steps from points[starts[q]] to ends[q] (candidates of the i-th point
+    are candidates[offsets[i]:offsets[i+1]]).
+
+    Returns list of indexes (see `next_points_kernel`).
+    '''
+
+    backend_name = choose_backend(backend_name)
+    kernel = get_kernel("next_points", backend_name)
+    out = get_zeros(len(starts), dtype=np.int64, backend_name=backend_name)
+
+    def get_coords(coords_list:list, i:int):
+        return to_sequence([float(coords[i]) for coords in coords_list], backend_name=backend_name)
+
+    kernel(to_sequence(starts, dtype=np.int64, backend_name=backend_name),
+           get_coords(ends, 0), get_coords(ends, 1),
+           get_coords(points, 0), get_coords(points, 1),
+           to_sequence(offsets, dtype=np.int64, backend_name=backend_name),
+           get_coords(candidates, 0), get_coords(candidates, 1),
+           out)
+
+    return to_list(out)
@@ -0,0 +1,146 @@
+"""
+Memory accounting of the Graph: allocations of phases of `Graph.set_edges` (measured with tracemalloc)
+and sizes of structures kept by the graph (estimated with sys.getsizeof).
+"""
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+
+class MemoryProfiler():
+    '''
+    Measures time, allocated memory and the peak of allocations of named phases.
+    Used as a context manager around phases: tracemalloc is started on enter
+    and stopped on exit (if it was not tracing before).
+    Disabled profiler (`enabled`=False) does not measure anything.
+    '''
+
+    def __init__(self, enabled:bool=True):
+        self.enabled = enabled
+        self.phases = {}
+        self.was_tracing = False
+
+
+    def __enter__(self):
+        if self.enabled:
+            self.was_tracing = tracemalloc.is_tracing()
+            if not self.was_tracing:
+                tracemalloc.start()
+        return self
+
+
+    def __exit__(self, *exception_info) -> None:
+        if self.enabled and not self.was_tracing:
+            tracemalloc.stop()
+
+
+    @contextmanager
+    def phase(self, name:str):
+        '''
+        Measures the code inside the `with` block as the phase `name`:
+            "seconds" - time of the phase;
+            "allocated" - bytes allocated in the phase and not freed after it;
+            "peak" - the highest number of bytes allocated during the phase (over the memory used before it).
+        '''
+
+        if not self.enabled:
+            yield
+            return
+
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases[name] = {
+                "seconds": time.perf_counter() - start,
+                "allocated": current - before,
+                "peak": peak - before,
+            }
+
+
+
+def get_structures_sizes(graph) -> dict:
+    '''
+    Estimates memory kept by structures of the graph. Every object is counted once,
+    in the first structure it belongs to (i.e. vertices of polygons are counted in "verts").
+
+    Returns dict: structure name -> {"count": number of objects, "bytes": bytes}.
+    '''
+
+    seen = set()
+
+    def get_size(obj) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+
+        size = sys.getsizeof(obj)
+        if hasattr(obj, "__dict__"):
+            size += sys.getsizeof(obj.__dict__)
+        if hasattr(obj, "coords"):
+            size += get_size(obj.coords)
+
+        return size
+
+    def get_structure_size(objects) -> dict:
+        objects = list(objects)
+        return {"count": len(objects), "bytes": sum(get_size(obj) for obj in objects)}
+
+    edges = graph.edges if graph.edges is not None else []
+    points = graph.verts + graph.intersection_points
+    graph_levels = graph.graph_levels if graph.graph_levels is not None else []
+    polys = [poly for level in graph_levels for poly in level.get("polygons")]
+
+    structures = {
+        "verts": get_structure_size(graph.verts),
+        "intersection_points": get_structure_size(graph.intersection_points),
+        "branches_points": get_structure_size([point.branches_points for point in points]
+                                              + [point.next_points for point in points]),
+        "edges": get_structure_size([edge for edge in edges] + [edge.end_points for edge in edges]
+                                    + [edge.intersection_points for edge in edges]
+                                    + [point for edge in edges for point in edge.intersection_points]),
+        "polygons": get_structure_size([poly for poly in polys] + [poly.verts for poly in polys]),
+        "polygons_edges": get_structure_size([edges for poly in polys for edges in [poly.inner_edges, poly.outer_edges]]
+                                             + [edge for poly in polys for edge in poly.inner_edges + poly.outer_edges]
+                                             + [edge.end_points for poly in polys for edge in poly.inner_edges + poly.outer_edges]),
+        "graph_levels": get_structure_size([level for level in graph_levels]
+                                           + [level.get(key) for level in graph_levels for key in ["polygons", "upper_boundary", "bottom_boundary"]]),
+    }
+
+    return structures
+
+
+def format_memory_profile(profile:dict) -> str:
+    '''
+    Formats the memory profile of the graph (see `Graph.memory_profile`) as a readable table.
+
+    Returns str.
+    '''
+
+    lines = [f"{'phase':<22}{'seconds':>10}{'allocated':>14}{'peak':>14}"]
+    for name, phase in profile["phases"].items():
+        lines.append(f"{name:<22}{phase['seconds']:>10.4f}{format_bytes(phase['allocated']):>14}{format_bytes(phase['peak']):>14}")
+
+    lines.append("")
+    lines.append(f"{'structure':<22}{'count':>10}{'bytes':>14}")
+    for name, structure in profile["structures"].items():
+        lines.append(f"{name:<22}{structure['count']:>10}{format_bytes(structure['bytes']):>14}")
+    lines.append(f"{'total':<22}{'':>10}{format_bytes(profile['total_bytes']):>14}")
+
+    return "\n".join(lines)
+
+
+def format_bytes(num_of_bytes:int) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(num_of_bytes) < 1024:
+            return f"{num_of_bytes:.1f} {unit}" if unit != "B" else f"{num_of_bytes} B"
+        num_of_bytes /= 1024
+
+    return f"{num_of_bytes:.1f} GiB"
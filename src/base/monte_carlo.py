@@ -0,0 +1,277 @@
+"""
+Statistical studies of even/odd area ratios over random bipartite graphs.
+
+Edge sets are generated as numpy arrays and areas are computed with `slab_utils`, without creating
+Graph objects. The i-th sample depends only on the seed and i, so results do not depend on
+the number of worker processes. Statistics are aggregated in constant memory.
+Optionally areas are cached once per orbit of symmetries of the square (see base/symmetry.py),
+so repeated samples (i.e. of small graphs) are computed once.
+"""
+
+from multiprocessing import Pool
+
+import numpy as np
+
+from base.slab_utils import get_parity_areas
+from base.symmetry import OrbitCache
+
+
+MODELS = ["density", "count", "degree"]
+
+
+
+class RandomGraphSampler():
+    '''
+    Generates random edge sets of graphs with `n` vertices on one side.
+
+    Models:
+        "density" - every possible edge is in the graph with probability `density`;
+        "count" - exactly `num_of_edges` different edges;
+        "degree" - every left vertex has `degree` different right neighbours.
+    '''
+
+    def __init__(self, n:int, model:str="density", density:float=0.5, num_of_edges:int=None,
+                 degree:int=None, seed:int=0):
+
+        if not isinstance(n, int) or n < 2:
+            raise Exception(f"`n` must be int greater than 1, now it is {n}.")
+        if model not in MODELS:
+            raise Exception(f"`model` must be one of {MODELS}, now it's {model}.")
+        if model == "density" and not 0 <= density <= 1:
+            raise Exception(f"`density` must be from the interval [0, 1], now it's {density}.")
+        if model == "count" and (not isinstance(num_of_edges, int) or not 0 <= num_of_edges <= n*n):
+            raise Exception(f"`num_of_edges` must be int from 0 to {n*n}, now it's {num_of_edges}.")
+        if model == "degree" and (not isinstance(degree, int) or not 0 <= degree <= n):
+            raise Exception(f"`degree` must be int from 0 to {n}, now it's {degree}.")
+
+        self.n = n
+        self.model = model
+        self.density = density
+        self.num_of_edges = num_of_edges
+        self.degree = degree
+        self.seed = seed
+
+
+    def get_rng(self, i:int) -> np.random.Generator:
+        '''
+        Returns random generator of the i-th sample.
+        '''
+
+        return np.random.default_rng([self.seed, i])
+
+
+    def sample(self, i:int) -> np.ndarray:
+        '''
+        Generates the i-th edge set.
+
+        Returns np.ndarray of shape (number of edges, 2).
+        '''
+
+        n = self.n
+        rng = self.get_rng(i)
+
+        if self.model == "degree":
+            right = np.argpartition(rng.random((n, n)), self.degree - 1, axis=1)[:, :self.degree] if self.degree > 0 \
+                else np.zeros((n, 0), dtype=np.int64)
+            left = np.repeat(np.arange(n), self.degree)
+            return np.stack([left, right.ravel()], axis=1)
+
+        if self.model == "density":
+            num_of_edges = rng.binomial(n*n, self.density)
+        else:
+            num_of_edges = self.num_of_edges
+
+        indexes = rng.choice(n*n, num_of_edges, replace=False)
+        return np.stack([indexes // n, indexes % n], axis=1)
+
+
+
+class StreamingStats():
+    '''
+    Mean, variance, min, max and histogram of values, updated one value at a time (constant memory).
+    Quantiles are approximated from the histogram with bins over [`low`, `high`].
+    Stats from separate workers can be merged.
+    '''
+
+    def __init__(self, low:float=0.0, high:float=1.0, bins:int=1000):
+        self.low = low
+        self.high = high
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.histogram = np.zeros(bins, dtype=np.int64)
+
+
+    def __repr__(self) -> str:
+        return f"StreamingStats(count={self.count}, mean={self.mean}, variance={self.get_variance()})"
+
+
+    def add(self, value:float) -> None:
+        '''
+        Adds value (Welford's algorithm).
+
+        Returns None.
+        '''
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        bins = len(self.histogram)
+        index = int((value - self.low) / (self.high - self.low) * bins)
+        self.histogram[min(max(index, 0), bins-1)] += 1
+
+
+    def merge(self, stats) -> None:
+        '''
+        Adds values of other StreamingStats (with the same bins) to self.
+
+        Returns None.
+        '''
+
+        if stats.count == 0:
+            return
+
+        count = self.count + stats.count
+        delta = stats.mean - self.mean
+        self.m2 += stats.m2 + delta**2 * self.count * stats.count / count
+        self.mean += delta * stats.count / count
+        self.count = count
+        self.min = min(self.min, stats.min)
+        self.max = max(self.max, stats.max)
+        self.histogram += stats.histogram
+
+
+    def get_variance(self) -> float:
+        '''
+        Returns the sample variance:float.
+        '''
+
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+
+    def get_quantile(self, q:float) -> float:
+        '''
+        Approximates the q-quantile (q from [0, 1]) by linear interpolation inside the histogram bin.
+
+        Returns float.
+        '''
+
+        if not 0 <= q <= 1:
+            raise Exception(f"`q` must be from the interval [0, 1], now it's {q}.")
+        if self.count == 0:
+            raise Exception("No values have been added.")
+
+        cumulative = np.cumsum(self.histogram)
+        target = q * self.count
+        index = min(int(np.searchsorted(cumulative, target)), len(self.histogram) - 1)
+        before = cumulative[index-1] if index > 0 else 0
+        in_bin = self.histogram[index]
+
+        bin_width = (self.high - self.low) / len(self.histogram)
+        fraction = (target - before) / in_bin if in_bin > 0 else 0.0
+
+        return float(min(max(self.low + (index + fraction) * bin_width, self.min), self.max))
+
+
+    def get_state(self) -> dict:
+        '''
+        Returns the whole state as dict of JSON types (see `from_state`).
+        '''
+
+        return {
+            "low": self.low,
+            "high": self.high,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": None if self.count == 0 else float(self.min),
+            "max": None if self.count == 0 else float(self.max),
+            "histogram": self.histogram.tolist(),
+        }
+
+
+    @classmethod
+    def from_state(cls, state:dict):
+        '''
+        Creates StreamingStats from the state returned by `get_state`.
+
+        Returns StreamingStats.
+        '''
+
+        stats = cls(state["low"], state["high"], len(state["histogram"]))
+        stats.count = state["count"]
+        stats.mean = state["mean"]
+        stats.m2 = state["m2"]
+        if stats.count != 0:
+            stats.min = state["min"]
+            stats.max = state["max"]
+        stats.histogram = np.array(state["histogram"], dtype=np.int64)
+
+        return stats
+
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.get_variance(),
+            "min": self.min,
+            "max": self.max,
+            "quantiles": {q: self.get_quantile(q) for q in [0.05, 0.25, 0.5, 0.75, 0.95]} if self.count else {},
+        }
+
+
+
+def run_chunk(args:tuple) -> StreamingStats:
+    '''
+    Computes statistics of the even area ratio (area of even levels / area of the square)
+    of samples with indexes from `start` to `stop` (with areas cached per orbit if `use_symmetry` is True).
+
+    Returns StreamingStats.
+    '''
+
+    sampler, start, stop, bins, use_symmetry = args
+    stats = StreamingStats(bins=bins)
+    square_area = (sampler.n - 1)**2
+    compute = OrbitCache().get_parity_areas if use_symmetry else get_parity_areas
+
+    for i in range(start, stop):
+        even_area, odd_area = compute(sampler.n, sampler.sample(i))
+        stats.add(even_area / square_area)
+
+    return stats
+
+
+def run_study(sampler:RandomGraphSampler, num_of_samples:int, processes:int=1, chunk_size:int=1000,
+              bins:int=1000, use_symmetry:bool=False) -> StreamingStats:
+    '''
+    Samples `num_of_samples` graphs and aggregates statistics of their even area ratios.
+    Chunks of samples are computed by `processes` worker processes and merged in order,
+    so the result is reproducible. If `use_symmetry` is True, areas are computed once per orbit
+    of symmetries of the square in every chunk (it pays off when samples repeat).
+
+    Returns StreamingStats.
+    '''
+
+    chunks = ((sampler, start, min(start + chunk_size, num_of_samples), bins, use_symmetry)
+              for start in range(0, num_of_samples, chunk_size))
+    stats = StreamingStats(bins=bins)
+
+    if processes == 1:
+        for chunk in chunks:
+            stats.merge(run_chunk(chunk))
+        return stats
+
+    with Pool(processes) as pool:
+        for chunk_stats in pool.imap(run_chunk, chunks):
+            stats.merge(chunk_stats)
+
+    return stats
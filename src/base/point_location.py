@@ -0,0 +1,162 @@
+from typing import Tuple
+
+import numpy as np
+
+from base.slab_utils import get_crossings_x
+
+
+
+class PointLocationIndex():
+    '''
+    Slab-based point location in the arrangement of graph edges.
+
+    The square is divided into slabs by x coordinates of intersection points. Inside a slab
+    the order of edges does not change, so the level of a point (number of edges below it)
+    is found by binary search over x coordinates of slabs and then over edges ordered in the slab.
+    Faces of one level are ordered by x, so the face is found by one more binary search.
+    '''
+
+    def __init__(self, n:int, line_coefs:np.ndarray, faces_min_x:np.ndarray=None, faces_levels:np.ndarray=None):
+        '''
+        Takes `n`:int, `line_coefs`:np.ndarray of shape (number of edges, 2) with coefficients (a, b)
+        of the edges and optionally `faces_min_x`, `faces_levels` - the smallest x coordinate and the level
+        of every face (face id is the index in these arrays).
+        '''
+
+        self.n = n
+        self.a = np.ascontiguousarray(line_coefs[:, 0], dtype=float)
+        self.b = np.ascontiguousarray(line_coefs[:, 1], dtype=float)
+
+        self.breakpoints = np.concatenate([[0.0], get_crossings_x(self.a, self.b, n), [n-1.0]])
+        x_mid = (self.breakpoints[1:] + self.breakpoints[:-1]) / 2
+        heights = self.a[None, :] * x_mid[:, None] + self.b[None, :]
+        self.order = np.argsort(heights, axis=1).astype(np.int32)  # (slabs, edges)
+
+        self.faces_ids = None
+        if faces_min_x is not None:
+            # faces sorted by level and then by x, key = level * n + x is increasing (x < n)
+            keys = faces_levels * float(n) + faces_min_x
+            self.faces_ids = np.argsort(keys, kind="stable")
+            self.faces_keys = keys[self.faces_ids]
+            self.faces_sorted_levels = faces_levels[self.faces_ids]
+
+
+    @classmethod
+    def from_arrays(cls, n:int, arrays:dict):
+        '''
+        Creates index from arrays returned by `get_arrays` (i.e. kept in shared memory) without computing them.
+
+        Returns PointLocationIndex.
+        '''
+
+        index = cls.__new__(cls)
+        index.n = n
+        index.a = arrays["a"]
+        index.b = arrays["b"]
+        index.breakpoints = arrays["breakpoints"]
+        index.order = arrays["order"]
+        index.faces_ids = arrays.get("faces_ids")
+        if index.faces_ids is not None:
+            index.faces_keys = arrays["faces_keys"]
+            index.faces_sorted_levels = arrays["faces_sorted_levels"]
+
+        return index
+
+
+    def get_arrays(self) -> dict:
+        '''
+        Returns dict of all arrays of the index (see `from_arrays`).
+        '''
+
+        arrays = {"a": self.a, "b": self.b, "breakpoints": self.breakpoints, "order": self.order}
+        if self.faces_ids is not None:
+            arrays.update(faces_ids=self.faces_ids, faces_keys=self.faces_keys, faces_sorted_levels=self.faces_sorted_levels)
+
+        return arrays
+
+
+    @classmethod
+    def from_graph(cls, graph):
+        '''
+        Builds index of the given Graph.
+
+        Returns PointLocationIndex.
+        '''
+
+        edges = graph.edges if graph.edges is not None else []
+        line_coefs = np.array([edge.line_coefs for edge in edges], dtype=float).reshape(-1, 2)
+
+        graph_levels = graph.graph_levels if graph.graph_levels is not None else graph.iter_graph_levels()
+        faces_min_x = []
+        faces_levels = []
+        for level in graph_levels:
+            for poly in level.get("polygons"):
+                faces_min_x.append(min(point.x for point in poly.verts))
+                faces_levels.append(level.get("level"))
+
+        return cls(graph.NUM_OF_VERTS, line_coefs, np.array(faces_min_x, dtype=float), np.array(faces_levels, dtype=np.int64))
+
+
+    def get_levels(self, x:np.ndarray, y:np.ndarray) -> np.ndarray:
+        '''
+        Finds levels of points (x[i], y[i]). Points outside the square get level -1.
+
+        Returns np.ndarray of levels.
+        '''
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = self.n
+        num_of_edges = len(self.a)
+
+        slabs = np.clip(np.searchsorted(self.breakpoints, x, side="right") - 1, 0, len(self.order) - 1)
+
+        # binary search over edges ordered in the slab: lower = number of edges below the point
+        lower = np.zeros(x.shape, dtype=np.int64)
+        upper = np.full(x.shape, num_of_edges, dtype=np.int64)
+        while True:
+            is_searched = lower < upper
+            if not is_searched.any():
+                break
+
+            middle = (lower + upper) // 2
+            lines = self.order[slabs, np.minimum(middle, num_of_edges - 1)]
+            is_below = self.a[lines] * x + self.b[lines] < y
+
+            lower = np.where(is_searched & is_below, middle + 1, lower)
+            upper = np.where(is_searched & ~is_below, middle, upper)
+
+        is_outside = (x < 0) | (x > n-1) | (y < 0) | (y > n-1)
+        return np.where(is_outside, -1, lower)
+
+
+    def get_faces(self, x:np.ndarray, levels:np.ndarray) -> np.ndarray:
+        '''
+        Finds faces of points with given x coordinates and levels. Points with level -1 get face -1.
+
+        Returns np.ndarray of face ids.
+        '''
+
+        if self.faces_ids is None:
+            raise Exception("Index has been built without faces.")
+
+        x = np.asarray(x, dtype=float)
+        if len(self.faces_keys) == 0:
+            return np.full(x.shape, -1, dtype=np.int64)
+
+        positions = np.searchsorted(self.faces_keys, levels * float(self.n) + x, side="right") - 1
+        positions = np.clip(positions, 0, len(self.faces_keys) - 1)
+        is_found = (levels >= 0) & (self.faces_sorted_levels[positions] == levels)
+
+        return np.where(is_found, self.faces_ids[positions], -1)
+
+
+    def locate(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Finds faces and levels of points (x[i], y[i]).
+
+        Returns (faces_ids, levels) - np.ndarrays, -1 for points outside the square.
+        '''
+
+        levels = self.get_levels(x, y)
+        return self.get_faces(x, levels), levels
@@ -0,0 +1,281 @@
+"""
+Sharing a built graph between processes without copying it.
+
+`SharedGraphStore` writes arrays of the graph (edges, points and their branches, faces, levels summary
+and the point location index) into one block of `multiprocessing.shared_memory`. Worker processes get
+only its small, picklable `descriptor` and attach `GraphView` - read-only NumPy views of the block,
+answering area, level and point location queries like the Graph.
+
+The store owns the block: it is removed by `close` (or leaving the `with` block), at the latest
+when the store is garbage collected or the interpreter exits. Views only detach from it.
+"""
+
+import weakref
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+from base.area_utils import levels_to_faces_arrays, summary_to_dict
+from base.point_location import PointLocationIndex
+
+
+ALIGNMENT = 64  # bytes, every array starts at a multiple of it
+
+
+
+def get_graph_arrays(graph) -> dict:
+    '''
+    Changes the graph to arrays:
+        "edges" - (left, right) vertices of edges, "line_coefs" - (a, b) coefficients of edges;
+        "points" - coords of vertices and intersection points, "branches_offsets", "branches" - branches points
+        of the i-th point are points[branches[branches_offsets[i]:branches_offsets[i+1]]];
+        "faces_coords", "faces_offsets", "faces_levels", "faces_areas" - see `Graph.get_faces_arrays`;
+        "levels_summary" - see `Graph.get_levels_summary`;
+        "index_*" - arrays of the point location index.
+
+    Returns dict: name -> np.ndarray.
+    '''
+
+    with graph.lock:
+        edges = graph.edges if graph.edges is not None else []
+        points = graph.verts + graph.intersection_points
+        points_ids = {point.coords: i for i, point in enumerate(points)}
+
+        branches = [[points_ids[point.coords] for point in point.branches_points] for point in points]
+        branches_offsets = np.zeros(len(points) + 1, dtype=np.int64)
+        np.cumsum([len(point_branches) for point_branches in branches], out=branches_offsets[1:])
+
+        if graph.graph_levels is not None:
+            faces = graph.get_faces_arrays()
+        else:
+            # levels are not kept - faces are computed once to be shared
+            faces = levels_to_faces_arrays(graph.iter_graph_levels())
+
+        arrays = {
+            "edges": np.array([(edge.end_points[0].y, edge.end_points[1].y) for edge in edges], dtype=np.int64).reshape(-1, 2),
+            "line_coefs": np.array([edge.line_coefs for edge in edges], dtype=float).reshape(-1, 2),
+            "points": np.array([point.coords for point in points], dtype=float).reshape(-1, 2),
+            "branches_offsets": branches_offsets,
+            "branches": np.array([i for point_branches in branches for i in point_branches], dtype=np.int64),
+            "faces_coords": faces["coords"],
+            "faces_offsets": faces["offsets"],
+            "faces_levels": faces["levels"],
+            "faces_areas": faces["areas"],
+            "levels_summary": graph.get_levels_summary(),
+        }
+
+        for name, array in graph.get_point_location_index().get_arrays().items():
+            arrays["index_" + name] = array
+
+    return arrays
+
+
+
+class SharedGraphStore():
+    '''
+    Arrays of the graph published in shared memory.
+
+    `descriptor` (dict with the name of the block, the number of vertices and the layout of arrays)
+    is passed to workers, which attach to the block by `GraphView.attach(descriptor)`.
+    '''
+
+    def __init__(self, graph):
+        arrays = get_graph_arrays(graph)
+
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[name] = {"dtype": array.dtype, "shape": array.shape, "offset": size}
+            size += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        # removes the block even if `close` is not called
+        self.finalizer = weakref.finalize(self, remove_shared_memory, self.shm)
+
+        for name, array in arrays.items():
+            view = get_array_view(self.shm, layout[name])
+            view[...] = array
+            del view
+
+        self.descriptor = {"name": self.shm.name, "n": graph.NUM_OF_VERTS, "layout": layout}
+
+
+    def __repr__(self) -> str:
+        return f"SharedGraphStore(name={self.descriptor['name']}, bytes={self.shm.size})"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        '''
+        Removes the shared memory block. Views attached to it in other processes stay valid
+        until they are closed, new views can not be attached.
+
+        Returns None.
+        '''
+
+        self.finalizer()
+
+
+
+def get_array_view(shm:shared_memory.SharedMemory, info:dict) -> np.ndarray:
+    '''
+    Creates the array described by `info` (dtype, shape and offset) on the shared memory block.
+    The array keeps the block exported, so the block can not be closed while the array
+    (or any view of it) exists.
+
+    Returns np.ndarray.
+    '''
+
+    count = int(np.prod(info["shape"], dtype=np.int64))
+    return np.frombuffer(shm.buf, dtype=info["dtype"], count=count, offset=info["offset"]).reshape(info["shape"])
+
+
+def remove_shared_memory(shm:shared_memory.SharedMemory) -> None:
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+
+class GraphView():
+    '''
+    Read-only view of the graph published by SharedGraphStore. Arrays are NumPy views of the shared memory
+    (nothing is copied), query methods work like the ones of the Graph.
+    '''
+
+    def __init__(self, shm:shared_memory.SharedMemory, descriptor:dict):
+        self.shm = shm
+        self.NUM_OF_VERTS = descriptor["n"]
+
+        self.arrays = {}
+        for name, info in descriptor["layout"].items():
+            array = get_array_view(shm, info)
+            array.flags.writeable = False
+            self.arrays[name] = array
+
+        self.point_location_index = None
+
+
+    @classmethod
+    def attach(cls, descriptor:dict):
+        '''
+        Attaches to the shared memory block described by `descriptor` (see SharedGraphStore).
+
+        Returns GraphView.
+        '''
+
+        return cls(shared_memory.SharedMemory(name=descriptor["name"]), descriptor)
+
+
+    def __repr__(self) -> str:
+        return f"GraphView(n={self.NUM_OF_VERTS}, edges={len(self.arrays['edges'])})" if self.arrays is not None \
+            else "GraphView(closed)"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        '''
+        Detaches from the shared memory block. Arrays taken from the view must not be used afterwards
+        (the block can not be detached while they are referenced).
+
+        Returns None.
+        '''
+
+        if self.shm is None:
+            return
+
+        self.arrays = None
+        self.point_location_index = None
+        try:
+            self.shm.close()
+        except BufferError:
+            raise Exception("Arrays of the view are still referenced, delete them and close the view again.")
+
+        self.shm = None
+
+
+    def get_array(self, name:str) -> np.ndarray:
+        if self.arrays is None:
+            raise Exception("The view has been closed.")
+        return self.arrays[name]
+
+
+    def get_edges(self) -> np.ndarray:
+        '''
+        Returns np.ndarray of shape (number of edges, 2) - (left, right) vertices of edges.
+        '''
+
+        return self.get_array("edges")
+
+
+    def get_faces_arrays(self) -> dict:
+        '''
+        Returns dict of faces arrays (see `Graph.get_faces_arrays`).
+        '''
+
+        return {name: self.get_array("faces_" + name) for name in ["coords", "offsets", "levels", "areas"]}
+
+
+    def get_levels_summary(self, as_dict:bool=False):
+        '''
+        Returns the levels summary (see `Graph.get_levels_summary`).
+        '''
+
+        summary = self.get_array("levels_summary")
+        return summary_to_dict(summary) if as_dict else summary
+
+
+    def get_area_of_levels(self) -> np.ndarray:
+        return self.get_levels_summary()["area"]
+
+
+    def get_area_of_polys(self) -> Tuple[float, float]:
+        areas_of_levels = self.get_area_of_levels()
+        return (float(areas_of_levels[0::2].sum()), float(areas_of_levels[1::2].sum()))
+
+
+    def get_area_of_level(self, level:int) -> float:
+        areas_of_levels = self.get_area_of_levels()
+
+        if not isinstance(level, int) or level < 0 or level >= len(areas_of_levels):
+            raise Exception("No such level in a graph.")
+
+        return float(areas_of_levels[level])
+
+
+    def locate_points(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Finds faces and levels containing the given points (see `Graph.locate_points`).
+
+        Returns (faces_ids, levels).
+        '''
+
+        if self.point_location_index is None:
+            arrays = {name[len("index_"):]: array for name, array in self.arrays.items() if name.startswith("index_")}
+            self.point_location_index = PointLocationIndex.from_arrays(self.NUM_OF_VERTS, arrays)
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return self.point_location_index.locate(points[:, 0], points[:, 1])
+
+
+    def locate_point(self, x:float, y:float) -> Tuple[int, int]:
+        faces_ids, levels = self.locate_points([(x, y)])
+        return (int(faces_ids[0]), int(levels[0]))
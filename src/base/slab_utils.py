@@ -0,0 +1,165 @@
+"""
+Array-based computations on the arrangement of graph edges.
+
+Every graph edge is a line y = a*x + b crossing the whole square, so a point of the square lies
+in the level equal to the number of edges below it. Between two consecutive x coordinates of
+intersection points (a slab) the order of edges does not change, so lengths of levels are linear in x
+and the area of every level in a slab is the slab width times the length in the middle of the slab.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+EPS = 10**(-5)  # computation error, the same as for intersection points of the Graph
+DECIMALS = 9  # x coordinates of intersection points closer than that are treated as equal
+MAX_CHUNK_ELEMENTS = 2**22  # bounds the memory used by a single chunk
+
+
+
+def get_unique_edges(n:int, edges) -> np.ndarray:
+    '''
+    Deletes duplicated edges and (0, 0), (n-1, n-1) edges (the same way as `Graph` does).
+
+    Takes `n`:int - number of vertices on one side and `edges` - list of tuples or np.ndarray of shape (E, 2).
+
+    Returns np.ndarray of shape (number of edges, 2).
+    '''
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+    if len(edges) != 0 and (edges.min() < 0 or edges.max() > n-1):
+        raise Exception(f"Vertices indexes in `edges` must be from 0 to {n-1} including.")
+
+    is_ignored = ((edges[:, 0] == 0) & (edges[:, 1] == 0)) | ((edges[:, 0] == n-1) & (edges[:, 1] == n-1))
+    return np.unique(edges[~is_ignored], axis=0)
+
+
+def get_lines_coefs(n:int, edges:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Takes `n`:int and `edges`:np.ndarray of shape (E, 2).
+
+    Returns (a, b) - coefficients of lines y = a*x + b going through the edges.
+    '''
+
+    edges = np.asarray(edges).reshape(-1, 2)
+    a = (edges[:, 1] - edges[:, 0]) / (n-1)
+    b = edges[:, 0].astype(float)
+
+    return a, b
+
+
+def get_crossings_x(a:np.ndarray, b:np.ndarray, n:int) -> np.ndarray:
+    '''
+    Finds x coordinates of intersection points of all pairs of lines lying inside the square.
+
+    Returns sorted np.ndarray of unique x coordinates.
+    '''
+
+    num_of_lines = len(a)
+    chunk_size = max(1, MAX_CHUNK_ELEMENTS // max(num_of_lines, 1))
+    crossings = []
+
+    for start in range(0, num_of_lines, chunk_size):
+        stop = min(start + chunk_size, num_of_lines)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = (b[None, :] - b[start:stop, None]) / (a[start:stop, None] - a[None, :])
+
+        # every pair only once (j > i), parallel lines give inf or nan
+        is_pair = np.arange(num_of_lines)[None, :] > np.arange(start, stop)[:, None]
+        is_inside = is_pair & (x > EPS) & (x < n-1-EPS)
+        crossings.append(np.unique(np.round(x[is_inside], DECIMALS)))
+
+    if len(crossings) == 0:
+        return np.zeros(0)
+    return np.unique(np.concatenate(crossings))
+
+
+def get_slabs(a:np.ndarray, b:np.ndarray, n:int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Divides the square into slabs - vertical strips without intersection points inside.
+
+    Returns (x_mid, widths) - middle x coordinates and widths of the slabs.
+    '''
+
+    breakpoints = np.concatenate([[0.0], get_crossings_x(a, b, n), [n-1.0]])
+
+    return (breakpoints[1:] + breakpoints[:-1]) / 2, np.diff(breakpoints)
+
+
+def get_levels_lengths(a:np.ndarray, b:np.ndarray, x:np.ndarray, n:int) -> np.ndarray:
+    '''
+    Calculates lengths of levels on vertical lines with the given x coordinates.
+
+    Returns np.ndarray of shape (len(x), number of lines + 1), the i-th column is the i-th level.
+    '''
+
+    heights = np.sort(a[None, :] * x[:, None] + b[None, :], axis=1)
+    bounds = np.concatenate([np.zeros((len(x), 1)), heights, np.full((len(x), 1), n-1.0)], axis=1)
+
+    return np.diff(bounds, axis=1)
+
+
+def get_levels_areas_on_slabs(a:np.ndarray, b:np.ndarray, x_mid:np.ndarray, widths:np.ndarray, n:int) -> np.ndarray:
+    '''
+    Calculates the area of every level of lines (a, b) summed over the given slabs.
+    Slabs must not contain intersection points of the lines inside (they can be finer than that).
+
+    Returns np.ndarray - i-th element is the area of the i-th level.
+    '''
+
+    areas = np.zeros(len(a) + 1)
+    chunk_size = max(1, MAX_CHUNK_ELEMENTS // (len(a) + 2))
+
+    for start in range(0, len(x_mid), chunk_size):
+        stop = start + chunk_size
+        lengths = get_levels_lengths(a, b, x_mid[start:stop], n)
+        areas += widths[start:stop] @ lengths
+
+    return areas
+
+
+def get_levels_areas(n:int, edges) -> np.ndarray:
+    '''
+    Calculates the area of every level of the graph with given edges, without creating the Graph.
+
+    Takes `n`:int and `edges` (list of tuples or np.ndarray of shape (E, 2)).
+
+    Returns np.ndarray - i-th element is the area of the i-th level.
+    '''
+
+    edges = get_unique_edges(n, edges)
+    a, b = get_lines_coefs(n, edges)
+    x_mid, widths = get_slabs(a, b, n)
+
+    return get_levels_areas_on_slabs(a, b, x_mid, widths, n)
+
+
+def get_crossings_with_lines(a_0:float, b_0:float, a:np.ndarray, b:np.ndarray, n:int) -> np.ndarray:
+    '''
+    Finds x coordinates of intersection points of the line y = a_0*x + b_0 with lines (a, b)
+    lying inside the square. Lines equal to the given one are skipped.
+
+    Returns sorted np.ndarray of unique x coordinates - different intersection points of the line.
+    '''
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (b - b_0) / (a_0 - a)
+
+    is_inside = (x > EPS) & (x < n-1-EPS)
+
+    return np.unique(np.round(x[is_inside], DECIMALS))
+
+
+def get_parity_areas(n:int, edges) -> Tuple[float, float]:
+    '''
+    Calculates the area of even and odd levels of the graph with given edges, without creating the Graph.
+
+    Returns (even_area_val, odd_area_val).
+    '''
+
+    areas = get_levels_areas(n, edges)
+
+    return (float(areas[0::2].sum()), float(areas[1::2].sum()))
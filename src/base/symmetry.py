@@ -0,0 +1,159 @@
+"""
+Symmetries of the graph square.
+
+Swapping sides, (i, j) -> (j, i), mirrors the square horizontally, and flipping it vertically,
+(i, j) -> (n-1-i, n-1-j), mirrors it vertically. Both map a graph onto a graph with the same faces.
+A point lying above k of L edges lies below k of them after the vertical flip, so its level becomes L - k:
+for odd L the flip swaps areas of even and odd levels.
+
+Every edge set is mapped to one representative of its orbit (the smallest sorted list of edges
+among its images), so results are computed once per orbit and transformed back.
+"""
+
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+from base.slab_utils import get_parity_areas
+
+
+SYMMETRIES = ["identity", "swap", "vflip", "swap_vflip"]
+FLIPPING_SYMMETRIES = ["vflip", "swap_vflip"]  # symmetries turning levels upside down
+
+
+
+def transform_edges(n:int, edges, symmetry:str) -> np.ndarray:
+    '''
+    Maps edges by the symmetry of the square (one of `SYMMETRIES`).
+
+    Returns np.ndarray of shape (number of edges, 2).
+    '''
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+    if symmetry == "identity":
+        return edges.copy()
+    if symmetry == "swap":
+        return edges[:, ::-1].copy()
+    if symmetry == "vflip":
+        return n-1 - edges
+    if symmetry == "swap_vflip":
+        return n-1 - edges[:, ::-1]
+
+    raise Exception(f"`symmetry` must be one of {SYMMETRIES}, now it's {symmetry}.")
+
+
+def is_parity_swapped(num_of_edges:int, symmetry:str) -> bool:
+    '''
+    Checks if the symmetry swaps areas of even and odd levels of the graph with `num_of_edges` different edges.
+
+    Returns bool.
+    '''
+
+    return symmetry in FLIPPING_SYMMETRIES and num_of_edges % 2 == 1
+
+
+def transform_areas(areas:Tuple[float, float], parity_swapped:bool) -> Tuple[float, float]:
+    '''
+    Returns (even_area_val, odd_area_val) of the transformed graph.
+    '''
+
+    return (areas[1], areas[0]) if parity_swapped else tuple(areas)
+
+
+def get_images(n:int, edges) -> dict:
+    '''
+    Maps edges by every symmetry (duplicated edges and (0, 0), (n-1, n-1) edges are deleted first).
+    Edges are kept as codes i*n + j, so sorted codes are edges sorted lexicographically.
+
+    Returns dict: symmetry -> sorted np.ndarray of codes of edges.
+    '''
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if len(edges) != 0 and (edges.min() < 0 or edges.max() > n-1):
+        raise Exception(f"Vertices indexes in `edges` must be from 0 to {n-1} including.")
+
+    codes = np.unique(edges[:, 0] * n + edges[:, 1])
+    codes = codes[(codes != 0) & (codes != n*n - 1)]
+    swapped_codes = np.sort(codes % n * n + codes // n)
+
+    return {
+        "identity": codes,
+        "swap": swapped_codes,
+        "vflip": n*n - 1 - codes[::-1],
+        "swap_vflip": n*n - 1 - swapped_codes[::-1],
+    }
+
+
+def codes_to_edges(n:int, codes:np.ndarray) -> np.ndarray:
+    return np.stack([codes // n, codes % n], axis=1)
+
+
+def canonicalize(n:int, edges) -> Tuple[np.ndarray, str, bool]:
+    '''
+    Maps edges to the representative of their orbit - the image with the smallest sorted list of edges.
+
+    Returns (canonical edges:np.ndarray, symmetry mapping edges to them:str,
+    parity_swapped:bool - if areas of even and odd levels of the representative are swapped).
+    '''
+
+    images = get_images(n, edges)
+    symmetry = min(SYMMETRIES, key=lambda symmetry: images[symmetry].tolist())
+    canonical_edges = codes_to_edges(n, images[symmetry])
+
+    return canonical_edges, symmetry, is_parity_swapped(len(canonical_edges), symmetry)
+
+
+def get_orbit(n:int, edges) -> list:
+    '''
+    Returns list of different graphs (sorted np.ndarrays of edges) the symmetries map edges to.
+    '''
+
+    orbit = {}
+    for image in get_images(n, edges).values():
+        orbit.setdefault(tuple(image.tolist()), codes_to_edges(n, image))
+
+    return list(orbit.values())
+
+
+
+class OrbitCache():
+    '''
+    Areas of even and odd levels cached once per orbit: graphs mapped onto each other by symmetries
+    share one entry, areas of the representative are transformed back.
+
+    Takes `compute` - function (n, edges) -> (even_area_val, odd_area_val) (areas from `slab_utils` by default)
+    and `maxsize`:int - the least recently used entries are forgotten above it (None - no limit).
+    '''
+
+    def __init__(self, compute=get_parity_areas, maxsize:int=None):
+        self.compute = compute
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __repr__(self) -> str:
+        return f"OrbitCache(entries={len(self.entries)}, hits={self.hits}, misses={self.misses})"
+
+
+    def get_parity_areas(self, n:int, edges) -> Tuple[float, float]:
+        '''
+        Returns (even_area_val, odd_area_val) of the graph with `n` vertices on one side and given edges.
+        '''
+
+        canonical_edges, symmetry, parity_swapped = canonicalize(n, edges)
+        key = (n, canonical_edges.tobytes())
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            self.entries[key] = self.compute(n, canonical_edges)
+            if self.maxsize is not None and len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return transform_areas(self.entries[key], parity_swapped)
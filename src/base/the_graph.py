@@ -1,29 +1,62 @@
-import matplotlib.pyplot as plt
-import numpy as np
-from typing import Union, Tuple
+import threading
+from contextlib import contextmanager
 
-import settings
+import numpy as np
+from typing import Tuple
 
 from base.base_graph_classes import Edge, Point, VertexPoint, IntersectionPoint, Poly
-from base.edge_utils import cross_prod, angle_between_edges
+from base import kernels
+from base.area_utils import polys_to_arrays, get_areas, get_levels_summary, summary_to_dict, levels_to_faces_arrays
+from base.point_location import PointLocationIndex
+from base.memory_profile import MemoryProfiler, get_structures_sizes
+from base.budget import Budget, GraphTimeoutError
+from base.area_estimate import estimate_parity_areas
+from base.face_diff import get_faces_changes, get_faces_subset
+from base.slab_utils import get_unique_edges, get_lines_coefs
 
 
+# attributes of the unpickled graph built on their first use
+PENDING_ATTRIBUTES = ["edges", "verts", "verts_by_coords", "points_by_coords", "intersection_points",
+                      "graph_levels", "memory_profile"]
+# permissible relative error of the sum of areas of found levels (see `check_level_area`)
+LEVELS_AREA_ERROR = 0.001
 
 
-class Graph():
-    edges = None
-    verts = None
-    intersection_points = []
-    all_points = []
-    graph_levels = None
 
-    def __init__(self, number_of_vertices:int, edges:list=None):
+class Graph():
+    '''
+    Bipartite graph drawn in a square: vertices of the 1st set lie on the left side (x = 0),
+    vertices of the 2nd set on the right side (x = n-1).
+
+    Thread safety: all state of the graph belongs to the instance, so separate graphs can be built
+    in parallel threads. `set_edges` and lazily built data (faces arrays, areas of levels,
+    point location index) are guarded by `self.lock` (threading.RLock). `set_edges` creates new
+    points, edges and polygons instead of changing the old ones, so objects taken from the graph
+    are never changed afterwards. Query methods (areas, point location) take the lock only to get
+    consistent data, so many threads can query one graph at the same time. Attributes read directly
+    while another thread runs `set_edges` may belong to different edge sets - hold `self.lock` then.
+    '''
+
+    # computed arrays sent with the pickled graph (they can be computed again from edges otherwise):
+    # "levels_summary" (small, answers area queries), "faces_arrays", "point_location_index"
+    PICKLED_ARRAYS = ("levels_summary",)
+
+    def __init__(self, number_of_vertices:int, edges:list=None, keep_levels:bool=True, profile_memory:bool=False,
+                 budget:Budget=None, build:bool=True, backend:str=None):
         '''
         The Graph object has two main attributes:
             number of vertices on one side - `number_of_vertices`:int (greater than 1);
             edges - `edges`:list 
                 edges list contains tuples (at least one) with two numbers:int (from 0 to `number_of_vertices`-1))
                 1st number is a vertex from 1st set (left one) and 2nd number is a vertex from 2nd set (right one)
+
+        Optionally takes `keep_levels`:bool - if False, polygons are not kept in `graph_levels` (streaming mode),
+        levels are computed one at a time (see `iter_graph_levels`) whenever they are needed.
+        Optionally takes `profile_memory`:bool and `budget`:Budget (see `set_edges`) and `build`:bool - if False,
+        edges are only validated and points, edges and polygons are built on their first use (like in the unpickled
+        graph), so `get_area_of_polys(approximate=True)` does not build the graph (`profile_memory` and `budget`
+        are not used then). Optionally takes `backend`:str - the backend of kernels used by this graph
+        ("python", "numba" or "auto", see `kernels.choose_backend`), the active backend if None.
         '''
 
         if not isinstance(number_of_vertices, int):
@@ -31,44 +64,306 @@ class Graph():
         if number_of_vertices < 2:
             raise Exception(f"`number_of_vertices` must be at least 2, now it is {number_of_vertices}.")
         
+        if backend is not None:
+            kernels.choose_backend(backend)
+
         self.NUM_OF_VERTS = number_of_vertices
+        self.keep_levels = keep_levels
+        self.backend = backend
+        self.lock = threading.RLock()
+        self.faces_arrays = None
+        self.levels_summary = None
+        self.point_location_index = None
+        self.budget = None
+
+        if not build:
+            self.set_pending_edges(edges)
+            return
+
+        self.edges = None
+        self.verts = None
+        self.verts_by_coords = {}
+        self.points_by_coords = {}
+        self.intersection_points = []
+        self.graph_levels = None
+        self.memory_profile = None
+        
+        self.set_edges(edges, profile_memory, budget)
 
-        self.verts = [
-            VertexPoint(0, num) for num in range(self.NUM_OF_VERTS)
-            ] + [
-            VertexPoint(self.NUM_OF_VERTS-1, num) for num in range(self.NUM_OF_VERTS)             
-            ]
 
-        
-        self.set_edges(edges)
+    # pickling section
+    def __reduce__(self):
+        '''
+        Pickles the graph compactly: number of vertices, edges as an array and computed arrays named in
+        `PICKLED_ARRAYS` (if they have been computed). Points, edges and polygons are not pickled,
+        they are built again on their first use (see `restore_graph`).
+        '''
+
+        with self.lock:
+            edges = self.get_edges_array()
+            arrays = {
+                "faces_arrays": self.faces_arrays,
+                "levels_summary": self.levels_summary,
+                "point_location_index": self.point_location_index.get_arrays() if self.point_location_index is not None else None,
+            }
+            arrays = {name: array for name, array in arrays.items() if name in self.PICKLED_ARRAYS and array is not None}
+
+        return (restore_graph, (self.NUM_OF_VERTS, edges, self.keep_levels, arrays))
+
+
+    def __getattr__(self, name:str):
+        # called only for missing attributes - points, edges and polygons of the unpickled graph
+        # are built on their first use
+        if name in PENDING_ATTRIBUTES and "lock" in self.__dict__:
+            with self.lock:
+                if name not in self.__dict__:
+                    self.build_pending_edges()
+                if name in self.__dict__:
+                    return self.__dict__[name]
+
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+
+    def set_pending_edges(self, edges:list) -> None:
+        '''
+        Validates `edges` (see `validate_edges`) and keeps them as an array, points, edges and polygons are built on their first use
+        (see `build_pending_edges`).
+
+        Takes `edges`:list.
+
+        Returns None.
+        '''
+
+        self.pending_edges = get_unique_edges(self.NUM_OF_VERTS, self.validate_edges(edges))
+
+
+    def get_edges_array(self) -> np.ndarray:
+        '''
+        Returns edges as np.ndarray of shape (number of edges, 2) - vertices of the 1st and the 2nd set,
+        without building the graph if it has not been built yet.
+        '''
+
+        with self.lock:
+            if "pending_edges" in self.__dict__:
+                return self.pending_edges
+
+            return np.array([(edge.end_points[0].y, edge.end_points[1].y) for edge in self.edges], dtype=np.int64).reshape(-1, 2)
+
+
+    def build_pending_edges(self) -> None:
+        '''
+        Builds points, edges and polygons of the unpickled graph, keeping its computed arrays.
+
+        Returns None.
+        '''
+
+        with self.lock:
+            if "pending_edges" not in self.__dict__:
+                return
+
+            edges = [(int(left), int(right)) for left, right in self.pending_edges]
+            graph = Graph(self.NUM_OF_VERTS, edges, self.keep_levels, backend=self.backend)
+
+            # all attributes at once, so other threads never see the graph half-built
+            self.__dict__.update({name: graph.__dict__[name] for name in PENDING_ATTRIBUTES})
+            del self.pending_edges
 
         
-    def set_edges(self, edges:list) -> None:
+    def set_edges(self, edges:list, profile_memory:bool=False, budget:Budget=None) -> None:
         '''
         Main function creating the graph. 
         Validates and sets all (apart from number of vertices) information about the graph.
 
-        Takes `edges`:list.
+        Takes `edges`:list and optionally `profile_memory`:bool - if True, memory used by phases of creating
+        the graph and by its structures is measured and kept in `self.memory_profile` (see base/memory_profile.py),
+        `budget`:Budget - limits time/work of creating the graph (see base/budget.py). If the budget is used up
+        or cancelled, GraphTimeoutError is raised and the graph keeps its previous edges.
 
         Returns None.
         '''
 
-        edges = self.validate_and_set_edges(edges)
-        edges = self.add_detailed_edges_info(edges)
-        intersection_points = self.add_intersection_points(edges)
-        self.intersection_points = intersection_points
+        profiler = MemoryProfiler(enabled=profile_memory)
+
+        with self.lock, profiler, self.use_budget(budget):
+            # the graph which has not been built yet is not built for the previous edges
+            pending_edges = self.__dict__.pop("pending_edges", None)
+            if pending_edges is not None:
+                self.__dict__.update(edges=None, verts=None, verts_by_coords={}, points_by_coords={},
+                                     intersection_points=[], graph_levels=None, memory_profile=None)
+
+            # the previous state is restored if the budget is used up
+            previous_state = (self.edges, self.verts_by_coords, self.verts, self.intersection_points, self.points_by_coords)
+            try:
+                levels, edges = self.create_graph(edges, profiler)
+            except GraphTimeoutError:
+                if pending_edges is not None:
+                    for name in PENDING_ATTRIBUTES:
+                        del self.__dict__[name]
+                    self.pending_edges = pending_edges
+                else:
+                    self.edges, self.verts_by_coords, self.verts, self.intersection_points, self.points_by_coords = previous_state
+                raise
+
+            self.edges = edges
+            
+            self.graph_levels = levels
+            self.faces_arrays = None
+            self.levels_summary = None
+            self.point_location_index = None
+            self.memory_profile = None
+
+            if profile_memory:
+                structures = get_structures_sizes(self)
+                self.memory_profile = {
+                    "phases": profiler.phases,
+                    "structures": structures,
+                    "total_bytes": sum(structure["bytes"] for structure in structures.values()),
+                }
+
+
+    def create_graph(self, edges:list, profiler:MemoryProfiler) -> tuple:
+        '''
+        Creates vertices, edges, intersection points and their branches, and levels of the graph
+        (if they are kept), measuring phases by `profiler`.
 
-        self.add_branches_to_points(edges, self.intersection_points)
-        levels = self.get_polygons()
+        Returns (graph levels or None, list of edges).
+        '''
 
-        self.edges = edges
-        
-        self.graph_levels = levels
+        with profiler.phase("verts_and_edges"):
+            # new vertices every time, so points of the previous graph are not changed
+            self.verts_by_coords = self.create_verts()
+
+            edges = self.validate_and_set_edges(edges)
+            self.verts = sorted(self.verts_by_coords.values(), key=lambda vert: vert.coords)
+
+        with profiler.phase("intersections"):
+            self.update_progress(phase="intersections")
+            edges = self.add_detailed_edges_info(edges)
+            intersection_points = self.add_intersection_points(edges)
+            self.intersection_points = intersection_points
+
+            # all points of the graph, to find points with info about the graph by coords
+            self.points_by_coords = {point.coords: point for point in self.verts + self.intersection_points}
+
+        with profiler.phase("branches"):
+            self.update_progress(phase="branches")
+            self.add_branches_to_points(edges, self.intersection_points)
+            self.add_next_points(self.verts + self.intersection_points)
+
+        with profiler.phase("polygons"):
+            # levels are searched along the new edges
+            self.edges = edges
+            levels = self.get_polygons() if self.keep_levels else None
+
+        return levels, edges
+
+
+    # budget section
+    @contextmanager
+    def use_budget(self, budget:Budget):
+        '''
+        Makes computations inside the `with` block check `budget` (if it is not None).
+        '''
+
+        with self.lock:
+            previous_budget = self.budget
+            if budget is not None:
+                self.budget = budget
+            try:
+                yield
+            finally:
+                self.budget = previous_budget
+
+
+    def check_budget(self, steps:int=1) -> None:
+        '''
+        Checks the budget of the current computation (if there is one), see `Budget.check`.
+
+        Returns None.
+        '''
+
+        if self.budget is not None:
+            self.budget.check(steps)
+
+
+    def update_progress(self, **progress) -> None:
+        '''
+        Saves the progress of the current computation in its budget (if there is one).
+
+        Returns None.
+        '''
+
+        if self.budget is not None:
+            self.budget.progress.update(progress)
+
+
+    def create_verts(self) -> dict:
+        '''
+        Creates corners of the graph. Other vertices are created only if they are ends of edges
+        (see `get_vert`) - vertices without edges do not change the polygons, so for big graphs
+        the cost depends on the number of edges, not on the number of vertices.
+
+        Returns dict: coords -> VertexPoint.
+        '''
+
+        n = self.NUM_OF_VERTS
+        corners = [VertexPoint(0, 0), VertexPoint(0, n-1), VertexPoint(n-1, 0), VertexPoint(n-1, n-1)]
+
+        return {vert.coords: vert for vert in corners}
+
+
+    def get_vert(self, x:int, y:int) -> VertexPoint:
+        '''
+        Gets the vertex of the graph with given coords, creates it if it does not exist yet.
+
+        Returns VertexPoint.
+        '''
+
+        vert = self.verts_by_coords.get((x, y))
+        if vert is None:
+            vert = VertexPoint(x, y)
+            self.verts_by_coords[(x, y)] = vert
+
+        return vert
+
+
+    def validate_edges(self, edges:list) -> list:
+        '''
+        Validates `edges` (the same way for graphs built at once and built on their first use).
+
+        Takes `edges`:list.
+
+        Returns list of edges (tuples) without duplicates and without (0, 0) and (n-1, n-1) edges.
+        '''
+
+        n = self.NUM_OF_VERTS
+
+        if not isinstance(edges, list):
+            raise Exception(f"`edges` must be of type list, now it is {type(edges)}.")
+
+        # 0 edges case
+        if len(edges) == 0:
+            print(f"`edges` is empty, no edges has been set.")
+            return []
+
+        # all elements are of type tuple and all tuples have exactly 2 element
+        if not all([isinstance(element, tuple) and len(element) == 2 for element in edges]):
+            raise Exception(f"All elements of `edges` must be tuple with 2 elements.")
+
+        # checks if all element in the tuples are ints in the interval [0, n-1]
+        indexes = [item for tuple_ in edges for item in tuple_]
+        if not all(isinstance(item, int) and item >= 0 and item <= n-1 for item in indexes):
+            raise Exception(f"Vertices indexes in `edges` must be from 0 to {n-1} including.")
+
+        # delete (0, 0) and (n-1, n-1) edges so they will not cause conflicts in the future
+        edges_without_duplicates = [edge for edge in edges if edge != (0, 0) and edge != (n-1, n-1)]
+        # delete duplicated edges
+        return list(set(edges_without_duplicates))
 
 
     def validate_and_set_edges(self, edges:list) -> list:
         '''
-        Validates `edges` and create edges.
+        Validates `edges` (see `validate_edges`) and create edges.
 
         Takes `edges`:list.
 
@@ -77,41 +372,13 @@ class Graph():
 
         n = self.NUM_OF_VERTS
 
-        if not isinstance(edges, list):
-            raise Exception(f"`number_of_vertices` must be of type list, now it is {type(edges)}.")
-        
-        # manages case when `edges` is a list
-        elif isinstance(edges, list):
-
-            # 0 edges case
-            if len(edges) == 0:
-                print(f"`edges` is empty, no edges has been set.")
-
-            # all elements are of type tuple and all tuples have exactly 2 element 
-            elif all([isinstance(element, tuple) and len(element) == 2 for element in edges]):
-
-                # checks if all element in the tuples are ints in the interval [0, n-1]
-                indexes = [item for tuple_ in edges for item in tuple_]
-                are_good_number = all(isinstance(item, int) and item >= 0 and item <= n-1 for item in indexes)
-
-                if are_good_number:
-                    # delete (0, 0) and (n-1, n-1) edges so they will not cause conflicts in the future
-                    edges_without_duplicates = [edge for edge in edges if edge != (0, 0) and edge != (n-1, n-1)]
-                    # delete duplicated edges
-                    edges_without_duplicates = list(set(edges_without_duplicates))
-                    
-                    processed_edges = []
-                    # creates Edges objects of given info
-                    for edge in edges_without_duplicates:
-                        x = [point for point in self.verts if point.coords == (0, edge[0])][0]
-                        y = [point for point in self.verts if point.coords == (n-1, edge[1])][0]
-                        processed_edges.append(Edge(x, y))
-                else:
-                    raise Exception(f"Vertices indexes in `edges` must be from 0 to {n-1} including.")
+        processed_edges = []
+        # creates Edges objects of given info
+        for edge in self.validate_edges(edges):
+            x = self.get_vert(0, edge[0])
+            y = self.get_vert(n-1, edge[1])
+            processed_edges.append(Edge(x, y))
 
-            else:
-                raise Exception(f"All elements of `edges` must be tuple with 2 elements.")
-            
         return processed_edges
 
             
@@ -136,31 +403,13 @@ class Graph():
             edge.line_coefs = ((vert_1.y - vert_0.y) / (self.NUM_OF_VERTS-1), vert_0.y)
 
         # adds intersection points of edges
-        for i in range(len(edges)):
-            inter_points = []
-            edge_0 = edges[i]
-            a_0, b_0 = edge_0.line_coefs
-
-            for j in range(len(edges)):
-                edge_1 = edges[j]
-                a_1, b_1 = edge_1.line_coefs
-
-                # if a_0 = a_1 - lines are parallel
-                if a_0 - a_1 != 0:
-                    # calculate 1st coordinate of the intersection point
-                    x_intersection = (b_1 - b_0) / (a_0 - a_1)
-
-                    # checks if intersection point is between 0 and n-1, that is inside the square
-                    eps = 10**(-5)  # computation error
-                    if x_intersection < self.NUM_OF_VERTS-1-eps and x_intersection > 0+eps:
+        intersections = kernels.get_edges_intersections([(edge.end_points[0].y, edge.end_points[1].y) for edge in edges],
+                                                        self.NUM_OF_VERTS-1,
+                                                        check=self.check_budget if self.budget is not None else None,
+                                                        backend_name=self.backend)
 
-                        # calculate 2nd coordinate of the intersection point
-                        y_intersection = a_0 * x_intersection + b_0 
-                        intersection_point = IntersectionPoint(round(x_intersection, 4), round(y_intersection, 4))
-
-                        inter_points.append(intersection_point)
-
-            edge_0.intersection_points = inter_points
+        for edge, coords in zip(edges, intersections):
+            edge.intersection_points = [IntersectionPoint(x, y) for x, y in coords]
 
         return edges
 
@@ -174,19 +423,15 @@ class Graph():
         Returns list of changed edges.
         '''
 
-        intersection_coords = []
-        intersection_points = []
+        # points keyed by coords, the first point with the given coords is kept
+        intersection_points = {}
 
         # iterates through edges
         for edge in edges:
-            # chooses only points being intersection points
             for point in edge.intersection_points:
-                # adds if there's no such point in the list
-                if point.coords not in intersection_coords:
-                    intersection_points.append(point)
-                    intersection_coords.append(point.coords)
+                intersection_points.setdefault(point.coords, point)
 
-        return intersection_points
+        return list(intersection_points.values())
 
 
     # branches points section
@@ -199,35 +444,60 @@ class Graph():
         Returns None.
         '''
 
-        left_verts = [vert for vert in self.verts if vert.x == 0]
-        right_verts = [vert for vert in self.verts if vert.x == self.NUM_OF_VERTS-1]
+        # groups edges by their ends once, so every vert gets only its own edges
+        edges_by_verts = {}
+        for edge in edges:
+            for side in [0, 1]:
+                edges_by_verts.setdefault(edge.end_points[side].coords, []).append(edge)
 
         # manage left side of square
-        for vert in left_verts:
-            vert.branches_points = self.get_branches_points_to_verts(edges, vert, "left")
+        left_verts = [vert for vert in self.verts if vert.x == 0]
+        for i in range(len(left_verts)):
+            left_verts[i].branches_points = self.get_branches_points_to_verts(
+                edges_by_verts.get(left_verts[i].coords, []), left_verts, i, "left")
 
         # manage right side of square
-        for vert in right_verts:
-            vert.branches_points = self.get_branches_points_to_verts(edges, vert, "right")
+        right_verts = [vert for vert in self.verts if vert.x == self.NUM_OF_VERTS-1]
+        for i in range(len(right_verts)):
+            right_verts[i].branches_points = self.get_branches_points_to_verts(
+                edges_by_verts.get(right_verts[i].coords, []), right_verts, i, "right")
+
+        # manage intersection_points - branches given by every edge are found in one pass over the edge
+        branches_by_inter_points = {}
+        for edge in edges:
+            for coords, branches_points in self.get_branches_points_on_edge(edge).items():
+                branches_by_inter_points.setdefault(coords, []).extend(branches_points)
 
-        # manage intersection_points
         for point in intersection_points:
-            point.branches_points = self.get_branches_points_to_inter_point(edges, point)
+            point.branches_points = branches_by_inter_points.get(point.coords, [])
 
-        # changes branches points having at most 2 branches points 
-        # to points having more branches points
-        for vert in left_verts:
-            self.delete_branches_points_having_at_most_two_branches_points(vert, left_verts)
 
-        for vert in right_verts:
-            self.delete_branches_points_having_at_most_two_branches_points(vert, right_verts)
+    def add_next_points(self, points:list) -> None:
+        '''
+        Chooses the next point of a polygon for every point and every branch point the polygon can come from
+        (see `get_next_edge_in_polygon`), for all points in one call of the kernel.
 
+        Takes `points`:list.
 
-    def get_branches_points_to_verts(self, edges:list, vert:Point, side:str) -> list:
+        Returns None.
         '''
-        Adds branches points to the given vert of the graph.
 
-        Takes `edges`:list, `vert`:Point, `side`:str ("left" or "right").
+        next_indexes = kernels.get_next_points_indexes([point.coords for point in points],
+                                                       [[branch.coords for branch in point.branches_points] for point in points],
+                                                       self.backend)
+
+        for point, indexes in zip(points, next_indexes):
+            point.next_points = [point if index == -1 else point.branches_points[index] for index in indexes]
+
+
+    def get_branches_points_to_verts(self, edges:list, side_verts:list, i:int, side:str) -> list:
+        '''
+        Adds branches points to the i-th vert of the side of the graph.
+
+        Takes `edges`:list (edges having an end in the vert), `side_verts`:list (vertices of the side sorted
+        by y - corners and ends of edges only), `i`:int and `side`:str ("left" or "right").
+        Vertices without edges are skipped, so the vert is connected with the nearest vertices
+        above and below having edges (or corners).
 
         Returns list of points.
         '''
@@ -239,16 +509,19 @@ class Graph():
         else:
             raise Exception(f"`side` must be 'right' or 'left', not f{side}.")
         
+        vert = side_verts[i]
         branches_points = []
         # manages corner verts
         if self.is_a_corner(vert):
             # gets corner lying on the same hight
-            temp_br = [point for point in self.verts if point.x != vert.x and point.y == vert.y][0]
+            temp_br = self.verts_by_coords[(self.NUM_OF_VERTS-1 - vert.x, vert.y)]
             branches_points.append(temp_br)
 
-        # gets points lying above or below the given vert
-        horizontal_br = [point for point in self.verts if point.x == vert.x and (point.y == vert.y-1 or point.y == vert.y+1)]
-        branches_points += horizontal_br
+        # gets the nearest points lying below and above the given vert
+        if i > 0:
+            branches_points.append(side_verts[i-1])
+        if i < len(side_verts)-1:
+            branches_points.append(side_verts[i+1])
 
         # gets branches points by graph edges
         for edge in edges:
@@ -267,120 +540,33 @@ class Graph():
         return branches_points
 
 
-    def get_branches_points_to_inter_point(self, edges:list, point:Point) -> list:
+    def get_branches_points_on_edge(self, edge:Edge) -> dict:
         '''
-        Adds branches points to intersection points.
+        Adds branches points given by the edge to its intersection points: the nearest points of the edge
+        having smaller and greater x coordinate (ends of the edge if there are no such intersection points).
 
-        Takes `edges`:list and `point`:Point.
+        Takes `edge`:Edge.
 
-        Returns list of the Point objects.
+        Returns dict: coords of the intersection point -> [point before, point after].
         '''
 
-        branches_points = []
+        # points sorted by x, the first point of every run of points with the same x represents the run
+        int_points = sorted(edge.intersection_points, key=lambda point: point.x)
+        runs_points = [point for i, point in enumerate(int_points) if i == 0 or point.x != int_points[i-1].x]
 
-        for edge in edges:
-            # gets all intersection points of the edge
-            int_points_coords = [pt.coords for pt in edge.intersection_points]
-
-            # if the point is an intersection point of the edge 
-            if point.coords in int_points_coords:
-                # sets before and after (having smaller and greater x coordinate) points to ends of the graph edge
-                point_before = edge.end_points[0]
-                point_after = edge.end_points[1]
-
-                # loops through intersection points
-                for inter_point in edge.intersection_points:
-                    # if the x coordinate is:  now best left point < current point < main point
-                    # change now best left point to current point
-                    if inter_point.x < point.x and inter_point.x > point_before.x:
-                        point_before = inter_point
-
-                    # if the x coordinate is: main point < current point < now best right point
-                    # change now best right point to current point
-                    if inter_point.x > point.x and inter_point.x < point_after.x:
-                        point_after = inter_point
-                
-                branches_points.append(point_before)
-                branches_points.append(point_after)
+        branches_points = {}
+        run = -1
+        for i, point in enumerate(int_points):
+            if i == 0 or point.x != int_points[i-1].x:
+                run += 1
+
+            point_before = runs_points[run-1] if run > 0 else edge.end_points[0]
+            point_after = runs_points[run+1] if run < len(runs_points)-1 else edge.end_points[1]
+            branches_points.setdefault(point.coords, [point_before, point_after])
 
         return branches_points
     
     
-    def delete_branches_points_having_at_most_two_branches_points(self, vert:Point, verts:list) -> None:
-        '''
-        Change branches points having at most branches points to points having more branches points.
-
-        Takes `vert`:Point, `verts`:list.
-
-        Returns None. 
-        '''
-        
-        n = self.NUM_OF_VERTS
-
-        # change points going down
-        if not self.is_a_corner(vert, "down"):
-            # gets point below the vert
-            point_to_fix = [point for point in vert.branches_points if point.coords == (vert.x, vert.y-1)][0]
-            if not self.if_ok_num_of_branches_points(point_to_fix):
-                new_point = self.get_fixed_point(vert, verts, -1)
-                vert.branches_points.remove(point_to_fix)
-                vert.branches_points.append(new_point)
-        
-        # change points going up
-        if not self.is_a_corner(vert, "up"):
-            # gets point above the vert
-            point_to_fix = [point for point in vert.branches_points if point.coords == (vert.x, vert.y+1)][0]
-            if not self.if_ok_num_of_branches_points(point_to_fix):
-                new_point = self.get_fixed_point(vert, verts, 1)
-                vert.branches_points.remove(point_to_fix)
-                vert.branches_points.append(new_point)
-        
-
-    def get_fixed_point(self, vert:Point, verts:list, fix:int) -> Point:
-        '''
-        Searches next point below or above (fix = -1 or fix = 1).
-
-        Takes `vert`, `verts` and `fix`:int (-1 or 1).
-
-        Returns point if it is ok (has proper number of branches points).
-        '''
-        if fix != -1 and fix != 1:
-            raise Exception(f"`fix` must be int and must be equal to '-1' or '1', now it's {fix}, type {type(fix)}.")
-        
-        # searches for the next point
-        new_point = [point for point in verts if point.coords == (vert.x, vert.y+fix)][0]
-
-        # checks if it is ok: if yes, return it; if no, continue searching 
-        if self.if_ok_num_of_branches_points(new_point):
-            new_point = self.get_fixed_point(vert, verts, fix)
-
-        return new_point
-
-
-    def if_ok_num_of_branches_points(self, point:Point) -> bool:
-        '''
-        Checks if point has enough branches points:
-            every corner is ok;
-            every intersection point is ok;
-            vert of the graph not being the corner is ok if has at least 3 branches points.
-
-        Takes `point`:Point.
-
-        Returns bool.
-        '''
-
-        n = self.NUM_OF_VERTS
-        
-        if self.is_a_corner(point):
-            return True
-        elif (point.x == 0 or point.x == n-1) and len(point.branches_points) >= 3:
-            return True
-        elif point.x != 0 and point.x != n-1:
-            return True
-
-        return False
-    
-
     # polygons section
     def get_polygons(self) -> list:
         '''
@@ -390,25 +576,38 @@ class Graph():
 
         Returns list of polygons with important info.
         '''
-        MAX_ITER = 200  # in case sth goes wrong 
 
-        graph_levels = []
+        return list(self.iter_graph_levels())
 
-        i = 0
-        if_continue = True
 
-        # manage the first polygon outside the loop
-        graph_level_0 = self.get_first_graph_level()
-        graph_levels.append(graph_level_0)
-
-        # loop until stop condition or max iterations hit 
-        while if_continue and i < MAX_ITER:
+    def iter_graph_levels(self):
+        '''
+        Generates levels of the graph one by one, starting from the bottom one.
+        Only the boundary between the current and the next level is kept,
+        so polygons of the level can be discarded as soon as the level is consumed.
+        Edges must not be changed (`set_edges`) while the generator is used.
 
-            # previous graph level
-            prev_level_info = graph_levels[-1]
+        Yields graph level dictionaries (see `get_polygons`).
+        '''
+        # a point lies above at most all edges, so there are at most len(edges) + 1 levels
+        max_level = len(self.edges)
+        self.update_progress(phase="polygons", levels_completed=0, levels_areas=[], even_area=0.0, odd_area=0.0)
 
-            temp_level = prev_level_info["level"] + 1
-            temp_bottom_boundary = prev_level_info["upper_boundary"]
+        # manage the first polygon outside the loop
+        graph_level = self.get_first_graph_level()
+        total_area = self.check_level_area(graph_level, 0.0)
+        self.add_level_to_progress(graph_level, total_area)
+        yield graph_level
+        if_continue = self.if_continue_level_searching(graph_level["upper_boundary"])
+
+        # loop until stop condition, long searches are limited by the budget
+        while if_continue:
+
+            temp_level = graph_level["level"] + 1
+            if temp_level > max_level:
+                raise Exception(f"Level {temp_level} found in the graph with {max_level} edges, levels are broken.")
+            self.check_budget()
+            temp_bottom_boundary = graph_level["upper_boundary"]
             polys =[]
 
             # iterate through edges of the bottom boundary of the level in search for polygons
@@ -433,12 +632,77 @@ class Graph():
                 "upper_boundary": edges,
                 "bottom_boundary": temp_bottom_boundary
             }
-            graph_levels.append(graph_level)
+            level_area = self.check_level_area(graph_level, total_area)
+            total_area += level_area
+            self.add_level_to_progress(graph_level, level_area)
+            yield graph_level
 
-            i += 1
             if_continue = self.if_continue_level_searching(graph_level["upper_boundary"])
 
-        return graph_levels
+
+    def check_level_area(self, graph_level:dict, total_area:float) -> float:
+        '''
+        Checks the found level as soon as it is found, so broken levels are not searched for up to len(edges) levels:
+        every level has positive area and all levels together are not bigger than the square.
+
+        Takes `graph_level`:dict and `total_area`:float - area of levels found before.
+
+        Returns area of the level.
+        '''
+
+        area = float(get_areas(*polys_to_arrays(graph_level["polygons"])).sum())
+        square_area = (self.NUM_OF_VERTS-1)**2
+
+        if area <= 0:
+            raise Exception(f"Level {graph_level['level']} has area {area}, levels are broken.")
+        if total_area + area > square_area * (1 + LEVELS_AREA_ERROR):
+            raise Exception(f"Levels up to {graph_level['level']} have area {total_area + area} bigger than "
+                            f"the square ({square_area}), levels are broken.")
+
+        return area
+
+
+    def add_level_to_progress(self, graph_level:dict, area:float) -> None:
+        '''
+        Adds the found level and its `area`:float to the progress of the current computation (if it has a budget),
+        so areas of completed levels are known if the budget is used up.
+
+        Returns None.
+        '''
+
+        if self.budget is None:
+            return
+
+        progress = self.budget.progress
+
+        progress["levels_completed"] += 1
+        progress["levels_areas"].append(area)
+        progress["even_area" if graph_level["level"] % 2 == 0 else "odd_area"] += area
+
+
+    def stream_area_of_levels(self, budget:Budget=None) -> dict:
+        '''
+        Calculates areas level by level, without keeping polygons of the graph
+        (peak memory is proportional to the widest level).
+
+        Optionally takes `budget`:Budget (see base/budget.py).
+
+        Returns dict with running totals:
+            "even" - area of even levels:float;
+            "odd" - area of odd levels:float;
+            "levels" - list of areas of the levels.
+        '''
+
+        totals = {"even": 0.0, "odd": 0.0, "levels": []}
+
+        with self.lock, self.use_budget(budget):
+            for graph_level in self.iter_graph_levels():
+                area = float(get_areas(*polys_to_arrays(graph_level["polygons"])).sum())
+
+                totals["levels"].append(area)
+                totals["even" if graph_level["level"] % 2 == 0 else "odd"] += area
+
+        return totals
 
 
     def if_continue_level_searching(self, graph_lever_upper_boundary_polygons:list) -> bool:
@@ -492,8 +756,10 @@ class Graph():
         cont = True
         i = 0
 
-        # loop until stop condition or i = 10 hits
-        while cont and i < 10:
+        # a polygon can not have more vertices than the graph has points, the budget limits the work
+        while cont and i <= len(self.points_by_coords):
+            self.check_budget()
+
             # gets the next edge in the polygon
             next_point = self.get_next_edge_in_polygon(edge, start_point)
 
@@ -525,9 +791,6 @@ class Graph():
         Returns Point
         '''
 
-        # search in all points in the graph - verts and intersection points
-        all_points = self.verts + self.intersection_points
-
         # set end point of the edge
         if start_point == edge.end_points[0]:
             end_point = edge.end_points[1]
@@ -536,30 +799,21 @@ class Graph():
         else:
             raise Exception(f"No such point in edge end_points.")
 
-        # make start_point a point found in all_points (cuz they have info about the graph i.e. their branches points)
-        for point in all_points:
-            if point == start_point:
-                start_point = point
-
-        # set the point so it can be changed into another one
-        temp_point = start_point
-        # set the angle so it can be compared to other angles 
-        temp_angle = np.pi * 2 
-
-        # iterate through branches points 
-        for point in start_point.branches_points:
-            # do not want to find end_point - point of the current edge
-            if point != end_point:
-
-                # calculate the angle and cross product of the edges
-                angle = angle_between_edges(Edge(start_point, end_point), Edge(start_point, point))
-                cross_product = cross_prod(Edge(start_point, end_point), Edge(start_point, point))
-
-                # cross product is used to orient the polygon
-                # the angle must be the smallest
-                if cross_product[2] >= 0 and angle < temp_angle:
-                    temp_angle = angle
-                    temp_point = point
+        # make start_point a point of the graph (cuz they have info about the graph i.e. their branches points)
+        start_point = self.points_by_coords.get(start_point.coords, start_point)
+
+        # the next point is chosen in advance for polygons coming from branch points (see `add_next_points`)
+        candidates = start_point.branches_points
+        for candidate, next_point in zip(candidates, start_point.next_points):
+            if candidate.coords == end_point.coords:
+                return next_point
+
+        # the point making the smallest angle with the edge, cross product is used to orient the polygon
+        index = kernels.get_next_point_index(start_point.coords, end_point.coords, [point.coords for point in candidates],
+                                             self.backend)
+
+        # if no point is found, the start point is returned
+        temp_point = start_point if index == -1 else candidates[index]
                 
         next_point = temp_point
         
@@ -567,20 +821,102 @@ class Graph():
     
 
     # calculating area section
-    def get_area_of_polys(self) -> Tuple[float, float]:
+    def get_faces_arrays(self) -> dict:
+        '''
+        Gets all polygons of the graph as arrays (computed once for the given edges):
+            "coords" - vertices of all polygons concatenated, np.ndarray of shape (number of vertices, 2);
+            "offsets" - vertices of the i-th polygon are coords[offsets[i]:offsets[i+1]];
+            "levels" - level of every polygon;
+            "areas" - area of every polygon.
+
+        Returns dict.
+        '''
+
+        with self.lock:
+            if self.faces_arrays is None:
+                if not self.keep_levels:
+                    raise Exception(f"Polygons are not kept in the graph (`keep_levels` is False), use `iter_graph_levels` instead.")
+
+                self.faces_arrays = levels_to_faces_arrays(self.graph_levels)
+
+            return self.faces_arrays
+
+
+    def get_levels_summary(self, as_dict:bool=False, budget:Budget=None):
+        '''
+        Gets the summary of every level of the graph (computed once for the given edges, in one pass over levels):
+            "level" - number of the level;
+            "faces" - number of polygons in the level;
+            "area" - total area of polygons in the level;
+            "verts" - total number of vertices of polygons in the level;
+            "min_x", "min_y", "max_x", "max_y" - bounding box of the level.
+
+        Optionally takes `as_dict`:bool - if True, dict of arrays (i.e. for `pandas.DataFrame`) is returned,
+        and `budget`:Budget - limits computing levels if they are not kept (see base/budget.py).
+
+        Returns np.ndarray of dtype `area_utils.LEVELS_SUMMARY_DTYPE` (one row per level) or dict.
+        '''
+
+        with self.lock, self.use_budget(budget):
+            if self.levels_summary is None:
+                if self.graph_levels is not None:
+                    faces = self.get_faces_arrays()
+                    self.levels_summary = get_levels_summary(faces["coords"], faces["offsets"], faces["levels"], len(self.graph_levels))
+                else:
+                    # levels are not kept - every level is summarized and forgotten
+                    rows = []
+                    for level in self.iter_graph_levels():
+                        polys = level.get("polygons")
+                        row = get_levels_summary(*polys_to_arrays(polys), np.zeros(len(polys), dtype=np.int64), 1)
+                        row["level"] = level.get("level")
+                        rows.append(row)
+
+                    self.levels_summary = np.concatenate(rows)
+
+            summary = self.levels_summary
+
+        return summary_to_dict(summary) if as_dict else summary
+
+
+    def get_area_of_levels(self, budget:Budget=None) -> np.ndarray:
+        '''
+        Calculates the area of polys in every level of the graph.
+
+        Optionally takes `budget`:Budget (see `get_levels_summary`).
+
+        Returns np.ndarray - i-th element is the area of the i-th level.
+        '''
+
+        return self.get_levels_summary(budget=budget)["area"]
+
+
+    def get_area_of_polys(self, budget:Budget=None, approximate:bool=False, tolerance:float=0.001,
+                          confidence:float=0.95):
         '''
         Calculates the area of polys in odd and even levels.
 
-        Returns (even_area_val, odd_area_val).
+        Optionally takes `budget`:Budget (see `get_levels_summary`) and `approximate`:bool - if True, areas are
+        estimated from sampled vertical lines (see base/area_estimate.py) without polygons, until the half-width
+        of the `confidence` interval is at most `tolerance` times the area of the square. The estimate can be
+        checked against exact areas by `check_if_sums_up_to_square(exact_even, estimate["odd"], tolerance)`.
+
+        Returns (even_area_val, odd_area_val) or, if `approximate` is True, dict - the estimate
+        (see `area_estimate.estimate_parity_areas`).
         '''
 
-        even_levels_polys = self.get_odd_or_even_levels_polys("even")
-        odd_levels_polys = self.get_odd_or_even_levels_polys("odd")
+        if approximate:
+            # only edges are needed, the graph is not built if it has been created with `build=False` or unpickled
+            def check(estimate:dict) -> None:
+                self.update_progress(phase="sampling", estimate=estimate)
+                self.check_budget(estimate["lines"])
+
+            with self.lock, self.use_budget(budget):
+                return estimate_parity_areas(self.NUM_OF_VERTS, self.get_edges_array(), tolerance, confidence,
+                                             check=check if self.budget is not None else None)
 
-        area_of_even_level = self.get_area_of_given_polys(even_levels_polys)
-        area_of_odd_level = self.get_area_of_given_polys(odd_levels_polys)
+        areas_of_levels = self.get_area_of_levels(budget)
         
-        return (area_of_even_level, area_of_odd_level)
+        return (float(areas_of_levels[0::2].sum()), float(areas_of_levels[1::2].sum()))
     
 
     def get_area_of_level(self, level:int) -> float:
@@ -595,13 +931,12 @@ class Graph():
         if not isinstance(level, int):
             raise Exception(f"`level` must be of type int, not it is {type(level)}")
         
-        polys_to_calc = [poly for level in self.graph_levels for 
-                         poly in level.get("polygons") if level.get("level") == level]
-        
-        if len(polys_to_calc) == 0:
+        areas_of_levels = self.get_area_of_levels()
+
+        if level < 0 or level >= len(areas_of_levels):
             raise Exception("No such level in a graph.")
         
-        return self.get_area_of_given_polys(polys_to_calc)
+        return float(areas_of_levels[level])
 
 
     def get_area_of_given_polys(self, polys:list) -> float:
@@ -617,24 +952,24 @@ class Graph():
         if not all([isinstance(poly, Poly) for poly in polys]):
             raise Exception(f"All elements of `polys` must be of type Poly.")
 
-        polys_area = 0
-
-        for poly in polys:
-            polys_area += poly.get_area()
-        
-        return polys_area
+        return float(get_areas(*polys_to_arrays(polys)).sum())
     
 
-    def check_if_sums_up_to_square(self, area_1:float, area_2:float, error_val:float=0.001) -> bool:
+    def check_if_sums_up_to_square(self, area_1:float=None, area_2:float=None, error_val:float=0.001) -> bool:
         '''
         Checks if sum of two areas is equal to area of the graph square.
 
-        Takes to floats representing areas and 
+        Takes to floats representing areas (by default areas of even and odd levels of the graph) and 
         optionally `error_val`:float representing permissible error of the area.
 
         Return bool.
         '''
 
+        if area_1 is None and area_2 is None:
+            area_1, area_2 = self.get_area_of_polys()
+        elif area_1 is None or area_2 is None:
+            raise Exception(f"`area_1` and `area_2` must be both given or both None.")
+
         if not isinstance(error_val, float) and error_val not in [0, 1]:
             raise Exception(f"`error_val` must be float or int from the interval [0,1], now it's {error_val} of type {type(error_val)}")
             
@@ -649,100 +984,161 @@ class Graph():
         return False
 
 
-    # draw section
-    def draw(self, edges:bool=True, intersections:bool=False, polygons:bool=False, frame:bool=False) -> plt:
+    # diff section
+    def diff(self, other_edges:list) -> dict:
         '''
-        Draws the graph using matplotlib.
+        Compares the graph with the graph of the same size having edges `other_edges`, without building it.
 
-        Returns the figure:plt.
+        Faces of the graph are reused (see base/face_diff.py): faces on both sides of removed edges are merged,
+        faces crossed by added edges are split and other faces only change their levels by the number
+        of added minus removed edges below them. Areas of levels of the graph are taken from `get_levels_summary`.
+
+        Takes `other_edges`:list of tuples.
+
+        Returns dict with:
+            "added_edges", "removed_edges" - lists of tuples,
+            "even_area_delta", "odd_area_delta" - changes of areas of even and odd levels,
+            "faces_added" - faces created by the change, dict like `get_faces_arrays` (levels in the changed graph),
+            "faces_removed" - faces deleted by the change, dict like `get_faces_arrays` (levels in the graph),
+            "faces_delta" - change of the number of faces,
+            "levels_areas_delta" - np.ndarray, i-th element is the change of the area of the i-th level.
         '''
+
         n = self.NUM_OF_VERTS
 
-        fig = plt.figure(figsize=(8, 8))
-        ax = fig.add_subplot()
-        ax.grid()
+        with self.lock:
+            edges = self.edges if self.edges is not None else []
+            edges_coords = set((edge.end_points[0].y, edge.end_points[1].y) for edge in edges)
+            other_coords = set(map(tuple, get_unique_edges(n, other_edges).tolist()))
 
-        points = [i for i in range(n)]
+            added_edges = sorted(other_coords - edges_coords)
+            removed_edges = sorted(edges_coords - other_coords)
 
-        ax.scatter(x=[0 for i in range(n)], y=points, **settings.right_side_points)
-        ax.scatter(x=[n-1 for i in range(n)], y=points, **settings.left_side_points)
+            # points of removed edges, sides of faces between them lie on the edges
+            removed_edges_points = [
+                set([edge.end_points[0].coords, edge.end_points[1].coords] + [point.coords for point in edge.intersection_points])
+                for edge in edges if (edge.end_points[0].y, edge.end_points[1].y) not in other_coords
+            ]
 
-        if edges and not (self.edges is None):
-            self.add_edges_to_draw(ax)
-        if intersections and not (self.edges is None):
-            self.add_intersections_to_draw(ax)
-        if polygons and not (self.graph_levels is None):
-            self.add_polygons_to_draw()
-        if frame:
-            self.add_frame_to_draw(ax)
+            faces = self.get_faces_arrays() if self.graph_levels is not None else levels_to_faces_arrays(self.iter_graph_levels())
+            old_areas = self.get_levels_summary()["area"]
+
+        changes = get_faces_changes(faces, removed_edges_points,
+                                    get_lines_coefs(n, np.array(removed_edges).reshape(-1, 2)),
+                                    get_lines_coefs(n, np.array(added_edges).reshape(-1, 2)),
+                                    get_lines_coefs(n, np.array(sorted(other_coords)).reshape(-1, 2)))
+        is_removed = changes["removed"]
+        faces_added = changes["added"]
+        shifts = changes["levels_shifts"]
+
+        # areas of levels of the changed graph - areas of the graph without removed faces, with added faces
+        # and with areas of faces below which edges have changed moved to their new levels
+        new_areas = np.zeros(max(len(edges_coords), len(other_coords)) + 1)
+        new_areas[:len(old_areas)] += old_areas
+        np.subtract.at(new_areas, faces["levels"][is_removed], faces["areas"][is_removed])
+        is_moved = shifts != 0
+        np.subtract.at(new_areas, faces["levels"][is_moved], faces["areas"][is_moved])
+        np.add.at(new_areas, faces["levels"][is_moved] + shifts[is_moved], faces["areas"][is_moved])
+        np.add.at(new_areas, faces_added["levels"], faces_added["areas"])
+
+        levels_areas_delta = new_areas.copy()
+        levels_areas_delta[:len(old_areas)] -= old_areas
+
+        removed_coords, removed_offsets = get_faces_subset(faces["coords"], faces["offsets"], is_removed)
+        faces_removed = {
+            "coords": removed_coords,
+            "offsets": removed_offsets,
+            "levels": faces["levels"][is_removed],
+            "areas": faces["areas"][is_removed],
+        }
 
-        
-        return plt
+        return {
+            "added_edges": added_edges,
+            "removed_edges": removed_edges,
+            "even_area_delta": float(levels_areas_delta[0::2].sum()),
+            "odd_area_delta": float(levels_areas_delta[1::2].sum()),
+            "faces_added": faces_added,
+            "faces_removed": faces_removed,
+            "faces_delta": len(faces_added["areas"]) - int(is_removed.sum()),
+            "levels_areas_delta": levels_areas_delta,
+        }
 
-    
-    def add_edges_to_draw(self, ax) -> None:
+
+    # point location section
+    def get_point_location_index(self) -> PointLocationIndex:
         '''
-        Adds edges to axes.
-        
-        Returns None.
+        Gets the point location index of the graph, built on first use and kept until the edges change.
+
+        Returns PointLocationIndex.
         '''
 
-        for edge in self.edges:
-            x = [0, self.NUM_OF_VERTS-1]
-            y = [edge.end_points[0].y, edge.end_points[1].y]
-            ax.plot(x, y, **settings.graph_edges_lines)
+        with self.lock:
+            if self.point_location_index is None:
+                self.point_location_index = PointLocationIndex.from_graph(self)
 
+            return self.point_location_index
 
-    def add_intersections_to_draw(self, ax) -> None:
+
+    def locate_points(self, points) -> Tuple[np.ndarray, np.ndarray]:
         '''
-        Adds intersection points to axes.
-        
-        Returns None.
+        Finds faces and levels containing the given points.
+        Face id is the index of the polygon in `get_odd_or_even_levels_polys("both")`.
+
+        Takes `points` - np.ndarray of shape (number of points, 2) or list of tuples (x, y).
+
+        Returns (faces_ids, levels) - np.ndarrays, -1 for points outside the graph square.
         '''
 
-        x = []
-        y = []
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return self.get_point_location_index().locate(points[:, 0], points[:, 1])
 
-        for point in self.intersection_points:
-            x.append(point.x)
-            y.append(point.y)
 
+    def locate_point(self, x:float, y:float) -> Tuple[int, int]:
+        '''
+        Finds the face and the level containing point (x, y).
 
-        ax.scatter(x, y, **settings.intersection_points)
+        Returns (face_id, level), (-1, -1) if the point is outside the graph square.
+        '''
 
+        faces_ids, levels = self.locate_points([(x, y)])
+        return (int(faces_ids[0]), int(levels[0]))
 
-    def add_polygons_to_draw(self) -> None:
+
+    # draw section (matplotlib is imported on the first drawing, see base/graph_drawing.py)
+    def draw(self, edges:bool=True, intersections:bool=False, polygons:bool=False, frame:bool=False):
         '''
-        Adds colored polygons to plt.
-        
-        Returns None.
+        Draws the graph using matplotlib.
+
+        Returns the figure:plt.
         '''
 
-        even_levels_polys = self.get_odd_or_even_levels_polys("even")
-        odd_levels_polys = self.get_odd_or_even_levels_polys("odd")
+        from base import graph_drawing
 
-        for poly in even_levels_polys:
-            X = np.array([list(point.coords) for point in poly.verts])
-            t1 = plt.Polygon(X, **settings.first_level_polygons)
-            plt.gca().add_patch(t1)
-            
-        for poly in odd_levels_polys:
-            X = np.array([list(point.coords) for point in poly.verts])
-            t1 = plt.Polygon(X, **settings.second_level_polygons)
-            plt.gca().add_patch(t1)
+        return graph_drawing.draw(self, edges, intersections, polygons, frame)
+
+    
+    def add_edges_to_draw(self, ax) -> None:
+        from base import graph_drawing
+
+        graph_drawing.add_edges_to_draw(self, ax)
+
+
+    def add_intersections_to_draw(self, ax) -> None:
+        from base import graph_drawing
+
+        graph_drawing.add_intersections_to_draw(self, ax)
+
+
+    def add_polygons_to_draw(self) -> None:
+        from base import graph_drawing
+
+        graph_drawing.add_polygons_to_draw(self)
         
 
     def add_frame_to_draw(self, ax) -> None:
-        '''
-        Adds fame to axes.
-        
-        Returns None.
-        '''
+        from base import graph_drawing
 
-        n = self.NUM_OF_VERTS
-        x = [0, 0, n-1, n-1, 0]
-        y = [0, n-1, n-1, 0, 0]
-        ax.plot(x, y, **settings.frame_lines)
+        graph_drawing.add_frame_to_draw(self, ax)
 
 
     # graph utils section
@@ -759,12 +1155,15 @@ class Graph():
             raise Exception(f'''`mode` must be str equal to 'even', 'odd' or 'both', 
                             now it's {mode} of type {type(mode)}.''')
         
+        with self.lock:
+            graph_levels = self.graph_levels if self.graph_levels is not None else list(self.iter_graph_levels())
+
         if mode == "even":
-            return [poly for level in self.graph_levels for poly in level.get("polygons") if level.get("level") % 2 == 0]
+            return [poly for level in graph_levels for poly in level.get("polygons") if level.get("level") % 2 == 0]
         elif mode == "odd":
-            return [poly for level in self.graph_levels for poly in level.get("polygons") if level.get("level") % 2 == 1]
+            return [poly for level in graph_levels for poly in level.get("polygons") if level.get("level") % 2 == 1]
             
-        return [poly for level in self.graph_levels for poly in level.get("polygons")]
+        return [poly for level in graph_levels for poly in level.get("polygons")]
     
 
     def is_a_corner(self, point:Point, mode:str="both") -> bool:
@@ -793,4 +1192,23 @@ class Graph():
             return True
         
         return False
-    
\ No newline at end of file
+    
+
+
+
+def restore_graph(number_of_vertices:int, edges:np.ndarray, keep_levels:bool, arrays:dict) -> Graph:
+    '''
+    Creates the unpickled graph (see `Graph.__reduce__`) without building it - computed arrays answer
+    area queries at once, points, edges and polygons are built on their first use.
+
+    Returns Graph.
+    '''
+
+    graph = Graph(number_of_vertices, [(int(left), int(right)) for left, right in edges], keep_levels, build=False)
+
+    graph.faces_arrays = arrays.get("faces_arrays")
+    graph.levels_summary = arrays.get("levels_summary")
+    graph.point_location_index = PointLocationIndex.from_arrays(number_of_vertices, arrays["point_location_index"]) \
+        if "point_location_index" in arrays else None
+
+    return graph
@@ -0,0 +1,215 @@
+"""
+Benchmarks of the project.
+
+    python benchmark.py                      # runs all benchmarks
+    python benchmark.py import_time          # runs chosen benchmarks
+    python benchmark.py --output bench.jsonl # appends results to the file (one JSON line per benchmark)
+
+Every benchmark returns a dict of measured values and a list of failed checks;
+the script exits with code 1 if any check fails, so it can guard against regressions.
+"""
+
+import json
+import subprocess
+import sys
+import time
+
+
+IMPORT_TIME_LIMIT = 0.5  # seconds
+CHECKPOINT_OVERHEAD_LIMIT = 0.1  # part of the batch time spent on checkpoints
+HEAVY_MODULES = ["matplotlib", "numba"]  # the compute core must not import them
+
+BENCHMARKS = {}
+
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+@benchmark
+def import_time(repeat:int=5) -> tuple:
+    '''
+    Measures the time of importing the compute core (base.the_graph) in a fresh interpreter.
+
+    Returns (results:dict, failed checks:list).
+    '''
+
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import base.the_graph\n"
+        "seconds = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': seconds, 'modules': [m for m in {HEAVY_MODULES} if m in sys.modules]}}))\n"
+    )
+
+    runs = []
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+
+    results = {
+        "seconds": min(run["seconds"] for run in runs),
+        "heavy_modules": sorted(set(module for run in runs for module in run["modules"])),
+    }
+
+    failed = []
+    if results["seconds"] > IMPORT_TIME_LIMIT:
+        failed.append(f"import takes {results['seconds']:.3f}s, limit is {IMPORT_TIME_LIMIT}s")
+    if len(results["heavy_modules"]) != 0:
+        failed.append(f"importing the core imports {results['heavy_modules']}")
+
+    return results, failed
+
+
+@benchmark
+def graph_build(n:int=10, num_of_edges:int=20, repeat:int=5) -> tuple:
+    '''
+    Measures building a random Graph and calculating its areas.
+
+    Returns (results:dict, failed checks:list).
+    '''
+
+    import random
+    from base.the_graph import Graph
+
+    rng = random.Random(0)
+    edges = [(rng.randrange(n), rng.randrange(n)) for i in range(num_of_edges)]
+
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        graph = Graph(n, edges)
+        graph.get_area_of_polys()
+        times.append(time.perf_counter() - start)
+
+    return {"n": n, "num_of_edges": num_of_edges, "seconds": min(times)}, []
+
+
+@benchmark
+def memory_profile(n:int=20, num_of_edges:int=40) -> tuple:
+    '''
+    Measures memory used by phases of building a random Graph and by its structures.
+
+    Returns (results:dict, failed checks:list).
+    '''
+
+    import random
+    from base.the_graph import Graph
+
+    rng = random.Random(0)
+    edges = [(rng.randrange(n), rng.randrange(n)) for i in range(num_of_edges)]
+
+    # the first graph compiles kernels (if numba is used), so the second one is measured
+    Graph(n, edges)
+    profile = Graph(n, edges, profile_memory=True).memory_profile
+
+    results = {
+        "n": n,
+        "num_of_edges": num_of_edges,
+        "phases_peak": {name: phase["peak"] for name, phase in profile["phases"].items()},
+        "structures_bytes": {name: structure["bytes"] for name, structure in profile["structures"].items()},
+        "structures_count": {name: structure["count"] for name, structure in profile["structures"].items()},
+        "total_bytes": profile["total_bytes"],
+    }
+
+    return results, []
+
+
+@benchmark
+def batch_checkpoint(n:int=8, num_of_graphs:int=500, checkpoint_every:int=50) -> tuple:
+    '''
+    Measures the time spent on checkpoints of the batch computation (base.batch).
+
+    Returns (results:dict, failed checks:list).
+    '''
+
+    import os
+    import random
+    import tempfile
+    from base.batch import run_batch
+
+    rng = random.Random(0)
+    edges_sets = [[(rng.randrange(n), rng.randrange(n)) for j in range(n)] for i in range(num_of_graphs)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = run_batch(n, edges_sets, os.path.join(directory, "output.jsonl"),
+                           os.path.join(directory, "checkpoint.json"), checkpoint_every)
+
+    results = {
+        "num_of_graphs": num_of_graphs,
+        "checkpoints": result["checkpoints"],
+        "seconds": result["seconds"],
+        "checkpoint_seconds": result["checkpoint_seconds"],
+        "overhead": result["checkpoint_seconds"] / result["seconds"],
+    }
+
+    failed = []
+    if results["overhead"] > CHECKPOINT_OVERHEAD_LIMIT:
+        failed.append(f"checkpoints take {results['overhead']:.1%} of the batch time, limit is {CHECKPOINT_OVERHEAD_LIMIT:.0%}")
+
+    return results, failed
+
+
+@benchmark
+def differential(num_of_random:int=50, max_n:int=8) -> tuple:
+    '''
+    Compares engines with the reference Graph (base.differential) and measures their speed ratios.
+
+    Returns (results:dict, failed checks:list).
+    '''
+
+    from base import kernels
+    from base.differential import run_harness, ENGINES
+
+    engines = [name for name in ENGINES if name != "numba" or kernels.NUMBA_BACKEND in kernels.get_available_backends()]
+
+    results = {}
+    failed = []
+    for name in engines:
+        report = run_harness(name, num_of_random, max_n)
+        results[name] = {
+            "cases": report["cases"],
+            "failures": len(report["failures"]),
+            "speed_ratio": report["speed_ratio"],
+            "minimal_edges": [failure["minimal_edges"] for failure in report["failures"]],
+        }
+        if len(report["failures"]) != 0:
+            failed.append(f"engine {name} differs from the reference in {len(report['failures'])} cases")
+
+    return results, failed
+
+
+
+def main(args:list) -> int:
+    output = None
+    if "--output" in args:
+        index = args.index("--output")
+        output = args[index + 1]
+        args = args[:index] + args[index + 2:]
+
+    names = args if len(args) != 0 else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if len(unknown) != 0:
+        raise Exception(f"Unknown benchmarks: {unknown}, available: {list(BENCHMARKS)}.")
+
+    exit_code = 0
+    for name in names:
+        results, failed = BENCHMARKS[name]()
+        line = json.dumps({"benchmark": name, "time": time.time(), "results": results, "failed": failed})
+        print(line)
+
+        if output is not None:
+            with open(output, "a") as file:
+                file.write(line + "\n")
+
+        if len(failed) != 0:
+            exit_code = 1
+
+    return exit_code
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))